@@ -48,15 +48,16 @@ class Collection(HuntsmanBase):
 
     def count_documents(self, *args, **kwargs):
         """ Count the number of matching documents in the collection.
+        The documents are counted by the DB so that they do not have to be transferred.
         Args:
-            *args, **kwargs: Parsed to self.find.
+            *args, **kwargs: Parsed to self._get_mongo_filter.
         Returns:
             int: The number of matching documents in the collection.
         """
-        return len(self.find(*args, **kwargs))
+        return self._collection.count_documents(self._get_mongo_filter(*args, **kwargs))
 
     def find(self, document_filter=None, date_min=None, date_max=None, date=None, key=None,
-             screen=False, quality_filter=False, limit=None):
+             screen=False, quality_filter=False, limit=None, fields=None):
         """Get data for one or more matches in the table.
         Args:
             document_filter (dict, optional): A dictionary containing key, value pairs to be
@@ -75,44 +76,29 @@ class Collection(HuntsmanBase):
             quality_filter (bool, optional): If True, only return documents that satisfy quality
                 cuts. Default False.
             limit (int): Limit the number of returned documents to this amount.
+            fields (list of str, optional): If provided, only these (flattened) fields and the
+                keys required by the document type are returned for each document. Default: None.
         Returns:
             result (list): List of DataIds or key values if key is specified.
         """
-        document_filter = Document(document_filter, copy=True)
-        with suppress(KeyError):
-            del document_filter["date_modified"]  # This might change so don't match with it
-
-        # Add date range to criteria if provided
-        date_constraint = {}
-
-        if date_min is not None:
-            date_constraint.update({"greater_than_equal": parse_date(date_min)})
-        if date_max is not None:
-            date_constraint.update({"less_than": parse_date(date_max)})
-        if date is not None:
-            date_constraint.update({"equal": parse_date(date)})
-
-        if date_constraint:
-            document_filter.update({self._date_key: date_constraint})
-
-        # Screen the results if necessary
-        # TODO: Move to raw exposure table
-        if screen:
-            document_filter[f"metrics.{METRIC_SUCCESS_FLAG}"] = True
-
-        mongo_filter = document_filter.to_mongo(flatten=True)
-
-        # Apply quality cuts
-        if quality_filter:
-            mongo_quality_filter = self._get_quality_filter()
-            if mongo_quality_filter:
-                mongo_filter = mongo_logical_and([mongo_filter, mongo_quality_filter])
+        mongo_filter = self._get_mongo_filter(document_filter, date_min=date_min,
+                                              date_max=date_max, date=date, screen=screen,
+                                              quality_filter=quality_filter)
 
         self.logger.debug(f"Performing mongo find operation with filter: {mongo_filter}.")
 
+        # Only return the required field if a key is specified to reduce the transferred data
+        projection = {"_id": False}
+        if key is not None:
+            projection[key] = True
+        if fields is not None:
+            # The required keys are needed to hash, compare and print the documents
+            projection.update({k: True for k in self._get_required_keys()})
+            projection.update({k: True for k in fields})
+
         if limit is None:
             limit = 0
-        cursor = self._collection.find(mongo_filter, {"_id": False}).limit(limit)
+        cursor = self._collection.find(mongo_filter, projection).limit(limit)
         documents = list(cursor)
 
         self.logger.debug(f"Find operation returned {len(documents)} results.")
@@ -123,6 +109,21 @@ class Collection(HuntsmanBase):
         # Skip validation to speed up - inserted documents should already be valid
         return [self._document_type(d, validate=False, config=self.config) for d in documents]
 
+    def find_unique_dates_ymd(self, *args, **kwargs):
+        """ Get the unique dates of matching documents in YYYY-MM-DD format.
+        The dates are computed by the DB so that the documents do not have to be transferred.
+        Args:
+            *args, **kwargs: Parsed to self._get_mongo_filter.
+        Returns:
+            set of str: The unique dates.
+        """
+        mongo_filter = self._get_mongo_filter(*args, **kwargs)
+
+        ymd = {"$dateToString": {"format": "%Y-%m-%d", "date": f"${self._date_key}"}}
+        pipeline = [{"$match": mongo_filter}, {"$group": {"_id": ymd}}]
+
+        return set([d["_id"] for d in self._collection.aggregate(pipeline) if d["_id"]])
+
     def find_one(self, *args, **kwargs):
         """ Find a single matching document. If multiple matches, raise a RuntimeError.
         Args:
@@ -233,13 +234,19 @@ class Collection(HuntsmanBase):
         self._collection.delete_one(mongo_filter)
 
     def insert_many(self, documents, **kwargs):
-        """Insert a new document into the table.
+        """ Insert new documents into the table using a single DB operation.
         Args:
             documents (list): List of dictionaries that specify documents to be inserted in the
                 table.
+            **kwargs: Parsed to pymongo insert_many.
         """
-        for d in documents:
-            self.insert_one(d, **kwargs)
+        docs = [self._prepare_doc_for_insert(d) for d in documents]
+        if not docs:
+            return
+
+        # Uniqueness is verified implicitly
+        self.logger.debug(f"Inserting {len(docs)} documents into {self}.")
+        self._collection.insert_many([d.to_mongo() for d in docs], **kwargs)
 
     def delete_many(self, documents, **kwargs):
         """ Delete one document from the table.
@@ -269,8 +276,15 @@ class Collection(HuntsmanBase):
         """ Delete all documents from the collection. """
         if not really:
             raise RuntimeError("If you really want to do this, parse really=True.")
-        docs = self.find()
-        self.delete_many(docs, **kwargs)
+        self.logger.debug(f"Deleting all documents from {self}.")
+        self._collection.delete_many({}, **kwargs)
+
+    def drop(self, really=False):
+        """ Drop the collection from the database, including its indexes. """
+        if not really:
+            raise RuntimeError("If you really want to do this, parse really=True.")
+        self.logger.debug(f"Dropping {self}.")
+        self._collection.drop()
 
     # Private methods
 
@@ -304,6 +318,57 @@ class Collection(HuntsmanBase):
         # Define which keys identify unique documents
         self._set_unique_keys()
 
+    def _get_mongo_filter(self, document_filter=None, date_min=None, date_max=None, date=None,
+                          screen=False, quality_filter=False):
+        """ Get the mongo filter corresponding to a set of query constraints.
+        Args:
+            document_filter (dict, optional): A dictionary containing key, value pairs to be
+                matched against other documents, by default None
+            date_min (object, optional): Constrain query to a timeframe starting at date_min,
+                by default None.
+            date_max (object, optional): Constrain query to a timeframe ending at date_max, by
+                default None.
+            date (object, optional):
+                Constrain query to specific date, by default None.
+            screen (bool, optional): If True, only return documents that passed screening.
+                Default False.
+            quality_filter (bool, optional): If True, only return documents that satisfy quality
+                cuts. Default False.
+        Returns:
+            dict: The mongo filter.
+        """
+        document_filter = Document(document_filter, copy=True)
+        with suppress(KeyError):
+            del document_filter["date_modified"]  # This might change so don't match with it
+
+        # Add date range to criteria if provided
+        date_constraint = {}
+
+        if date_min is not None:
+            date_constraint.update({"greater_than_equal": parse_date(date_min)})
+        if date_max is not None:
+            date_constraint.update({"less_than": parse_date(date_max)})
+        if date is not None:
+            date_constraint.update({"equal": parse_date(date)})
+
+        if date_constraint:
+            document_filter.update({self._date_key: date_constraint})
+
+        # Screen the results if necessary
+        # TODO: Move to raw exposure table
+        if screen:
+            document_filter[f"metrics.{METRIC_SUCCESS_FLAG}"] = True
+
+        mongo_filter = document_filter.to_mongo(flatten=True)
+
+        # Apply quality cuts
+        if quality_filter:
+            mongo_quality_filter = self._get_quality_filter()
+            if mongo_quality_filter:
+                mongo_filter = mongo_logical_and([mongo_filter, mongo_quality_filter])
+
+        return mongo_filter
+
     def _set_unique_keys(self):
         """ Define the set of keys (if any) that identify a unique document.
         This approach leverages mongdb's server-side locking mechanism to ensure thread-safety on
@@ -321,6 +386,13 @@ class Collection(HuntsmanBase):
         """ Return the Query object corresponding to quality cuts. """
         raise NotImplementedError
 
+    def _get_required_keys(self):
+        """ Get the keys required by the document type of this collection.
+        Returns:
+            set of str: The required keys.
+        """
+        return set(self._document_type._required_keys)
+
     def _prepare_doc_for_insert(self, document):
         """ Prepare a document to be inserted into the database.
         Args:
@@ -368,6 +440,40 @@ class RawExposureCollection(Collection):
 
         return super().insert_one(document, *args, **kwargs)
 
+    def insert_many(self, documents, *args, **kwargs):
+        """ Override to make sure the documents do not clash with fpacked versions.
+        Args:
+            documents (list of RawExposureDocument): The documents to insert.
+            *args, **kwargs: Parsed to super().insert_many
+        Raises:
+            DuplicateKeyError: If a .fz / .fits duplicate already exists.
+        """
+        documents = [self._document_type(d, copy=True, config=self.config) for d in documents]
+
+        # Check for duplicates using a single query
+        duplicates = []
+        for doc in documents:
+            filename = doc["filename"]
+            if filename.endswith(".fits"):
+                duplicates.append(filename + ".fz")
+            elif filename.endswith(".fits.fz"):
+                duplicates.append(filename[:-len(".fz")])
+
+        # Check for duplicates within the documents themselves
+        filenames = set([d["filename"] for d in documents])
+        clashes = [f for f in duplicates if f in filenames]
+        if clashes:
+            raise DuplicateKeyError(f"Tried to insert both .fz and .fits versions of files:"
+                                    f" {clashes}.")
+
+        if duplicates:
+            existing = self.find({"filename": {"in": duplicates}}, key="filename")
+            if existing:
+                raise DuplicateKeyError(f"Tried to insert {len(existing)} files but .fz / .fits"
+                                        f" versions exist: {existing}.")
+
+        return super().insert_many(documents, *args, **kwargs)
+
     def get_matching_raw_calibs(self, calib_document, calib_date, validity=None):
         """ Return matching set of calib IDs for a given data_id and calib_date.
         Args:
@@ -432,7 +538,9 @@ class RawExposureCollection(Collection):
         else:
             documents = [d for d in documents if d["dataType"] in data_types]
 
-        calib_docs = set([self.raw_doc_to_calib_doc(d, calib_date) for d in documents])
+        # Convert the calib date once rather than for every document
+        calib_date_ymd = date_to_ymd(calib_date)
+        calib_docs = {self._raw_doc_to_calib_doc(d, calib_date_ymd) for d in documents}
 
         self.logger.info(f"Found {len(calib_docs)} calibIds for calib_date={calib_date}.")
 
@@ -446,6 +554,26 @@ class RawExposureCollection(Collection):
         Returns:
             CalibDocument: The matching calib document.
         """
+        return self._raw_doc_to_calib_doc(document, date_to_ymd(calib_date))
+
+    def clear_calexp_metrics(self):
+        """ Clear all calexp metrics from the collection.
+        This is useful e.g. to trigger them for reprocessing. """
+
+        self.logger.info(f"Clearing all calexp metrics from {self}.")
+
+        self._collection.update_many({}, {"$unset": {"metrics.calexp": ""}})
+
+    # Private methods
+
+    def _raw_doc_to_calib_doc(self, document, calib_date_ymd):
+        """ Convert a RawExposureDocument into its corresponding CalibDocument.
+        Args:
+            document (RawExposureDocument): The raw calib document.
+            calib_date_ymd (str): The calib date in YYYY-MM-DD format.
+        Returns:
+            CalibDocument: The matching calib document.
+        """
         calib_type = document["dataType"]
 
         # Get minimal calib metadata
@@ -453,21 +581,20 @@ class RawExposureCollection(Collection):
         calib_dict = {k: document[k] for k in keys}
 
         # Add extra required metadata
-        calib_dict["calibDate"] = date_to_ymd(calib_date)
+        calib_dict["calibDate"] = calib_date_ymd
         calib_dict["datasetType"] = calib_type
         calib_dict["filename"] = get_calib_filename(calib_dict, config=self.config)
 
         return CalibDocument(calib_dict)
 
-    def clear_calexp_metrics(self):
-        """ Clear all calexp metrics from the collection.
-        This is useful e.g. to trigger them for reprocessing. """
-
-        self.logger.info(f"Clearing all calexp metrics from {self}.")
-
-        self._collection.update_many({}, {"$unset": {"metrics.calexp": ""}})
-
-    # Private methods
+    def _get_required_keys(self):
+        """ Override to include the required FITS header columns from the config.
+        Returns:
+            set of str: The required keys.
+        """
+        keys = super()._get_required_keys()
+        keys.update(self.config["fits_header"]["required_columns"])
+        return keys
 
     def _get_quality_filter(self):
         """ Return the Query object corresponding to quality cuts.
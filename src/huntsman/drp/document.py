@@ -45,7 +45,7 @@ class Document(abc.Mapping):
 
     def __eq__(self, o):
         with suppress(KeyError):
-            return all([self[k] == o[k] for k in self._required_keys])
+            return all(self[k] == o[k] for k in self._required_keys)
         return False
 
     def __hash__(self):
@@ -9,7 +9,7 @@ from huntsman.drp.utils.date import parse_date
 def read_fits_data(filename, dtype="float32", **kwargs):
     """ Read fits image into numpy array.
     """
-    return fits.getdata(filename, **kwargs).astype(dtype)
+    return fits.getdata(filename, **kwargs).astype(dtype, copy=False)
 
 
 def read_fits_header(filename, ext="auto"):
@@ -23,27 +23,50 @@ def read_fits_header(filename, ext="auto"):
         dict: The header dictionary.
     """
     if ext == "all":
+        # Open the file once rather than reopening it and rescanning the HDUs for each extension
         header = fits.Header()
-        i = 0
-        while True:
-            try:
-                header.extend(fits.getheader(filename, ext=i))
-            except IndexError:
-                if i > 1:
-                    return header
-            i += 1
+        with fits.open(filename) as hdulist:
+            for hdu in hdulist:
+                header.extend(hdu.header)
+        return header
     elif ext == "auto":
-        if filename.endswith(".fits"):
-            ext = 0
-        elif filename.endswith(".fits.fz"):  # <----- CHECK THIS
-            ext = 1
-        else:
-            raise ValueError(f"Unrecognised FITS extension for {filename}.")
+        ext = _get_auto_ext(filename)
     else:
         ext = int(ext)
     return fits.getheader(filename, ext=ext)
 
 
+def read_fits_header_and_data(filename, ext="auto", dtype="float32"):
+    """ Read the FITS header and image data for a given filename, opening the file only once.
+    Args:
+        filename (str): The filename.
+        ext (str or int): Which FITS extension to use. If 'auto' (default), will choose based on
+            file extension. Else, will use int(ext) as the ext number.
+        dtype (str, optional): The dtype of the returned array. Default: "float32".
+    Returns:
+        astropy.io.fits.Header: The header.
+        np.array: The image data.
+    """
+    ext = _get_auto_ext(filename) if ext == "auto" else int(ext)
+    with fits.open(filename, memmap=True) as hdulist:
+        hdu = hdulist[ext]
+        return hdu.header, hdu.data.astype(dtype, copy=False)
+
+
+def _get_auto_ext(filename):
+    """ Get the FITS extension containing the image based on the file extension.
+    Args:
+        filename (str): The filename.
+    Returns:
+        int: The FITS extension number.
+    """
+    if filename.endswith(".fits"):
+        return 0
+    elif filename.endswith(".fits.fz"):  # <----- CHECK THIS
+        return 1
+    raise ValueError(f"Unrecognised FITS extension for {filename}.")
+
+
 class FitsHeaderTranslatorBase(HuntsmanBase):
     """
     Class used to map information in FITS headers to variables required by the DRP.
@@ -131,19 +154,17 @@ class FitsHeaderTranslator(FitsHeaderTranslatorBase):
         Args:
             header (dict): Raw FITS header.
         """
-        # Copy the whole header
-        result = dict()
-        for key, value in header.items():
-            result[key] = value
-
-        # Also store mappings, overwriting if necessary
-        for column in self.config["fits_header"]["required_columns"]:
-            result[column] = getattr(self, f"translate_{column}")(header)
-
-        # Explicitly parse the date in specialised format with different key
-        result[self._date_key] = self._translate_date(header)
+        return self._parse_header(header, translators=self._get_translators())
 
-        return result
+    def parse_headers(self, headers):
+        """ Parse several headers, looking up the translation functions only once.
+        Args:
+            headers (iterable of dict): The raw FITS headers.
+        Returns:
+            list of dict: The parsed headers.
+        """
+        translators = self._get_translators()
+        return [self._parse_header(header, translators=translators) for header in headers]
 
     def read_and_parse(self, filename, **kwargs):
         """ Convenience function to read a FITS header from file and parse it.
@@ -154,6 +175,32 @@ class FitsHeaderTranslator(FitsHeaderTranslatorBase):
         """
         return self.parse_header(read_fits_header(filename, **kwargs))
 
+    def _get_translators(self):
+        """ Get the translation functions for the required columns.
+        Returns:
+            list of tuple: List of (column, function) pairs.
+        """
+        columns = self.config["fits_header"]["required_columns"]
+        return [(column, getattr(self, f"translate_{column}")) for column in columns]
+
+    def _parse_header(self, header, translators):
+        """ Parse header key/values into standardised python objects.
+        Args:
+            header (dict): Raw FITS header.
+            translators (list of tuple): The translation functions from self._get_translators.
+        """
+        # Copy the whole header
+        result = dict(header.items())
+
+        # Also store mappings, overwriting if necessary
+        for column, translator in translators:
+            result[column] = translator(header)
+
+        # Explicitly parse the date in specialised format with different key
+        result[self._date_key] = self._translate_date(header)
+
+        return result
+
     def _translate_date(self, header):
         """ Translate the date from the FITS header to a format recognised by pymongo. """
         date_key = self.config["fits_header"]["date_key"]
@@ -13,6 +13,23 @@ from huntsman.drp.utils import load_module
 
 METRICS = ("zeropoint", "psf", "background", "sourcecat")
 
+_METRIC_FUNCS = {}  # Cache of metric name: metric function
+
+
+def _get_metric_func(func_name):
+    """ Get a metric function by name, caching the result to avoid repeated imports.
+    Args:
+        func_name (str): The name of the metric function in this module.
+    Returns:
+        Function: The metric function.
+    """
+    try:
+        return _METRIC_FUNCS[func_name]
+    except KeyError:
+        func = load_module(f"huntsman.drp.metrics.calexp.{func_name}")
+        _METRIC_FUNCS[func_name] = func
+        return func
+
 
 def calculate_metrics(task_result, metrics=METRICS, logger=None):
     """ Evaluate metrics for a single calexp.
@@ -33,7 +50,7 @@ def calculate_metrics(task_result, metrics=METRICS, logger=None):
 
     for func_name in metrics:
 
-        func = load_module(f"huntsman.drp.metrics.calexp.{func_name}")
+        func = _get_metric_func(func_name)
 
         try:
             metric_dict = func(task_result)
@@ -104,7 +121,7 @@ def zeropoint(task_result):
         return {}
 
     # Find number of sources used for photocal
-    n_sources = sum(task_result["calibRes"].sourceCat["calib_photometry_used"])
+    n_sources = np.count_nonzero(task_result["calibRes"].sourceCat["calib_photometry_used"])
 
     calexp = task_result["exposure"]
     pc = calexp.getPhotoCalib()
@@ -136,7 +153,7 @@ def psf(task_result):
         return {"psfSuccess": False}
 
     # Find number of sources used to measure PSF
-    n_sources = sum(task_result["charRes"].sourceCat["calib_psf_used"])
+    n_sources = np.count_nonzero(task_result["charRes"].sourceCat["calib_psf_used"])
 
     calexp = task_result["exposure"]
 
@@ -1,5 +1,7 @@
 from contextlib import suppress
 
+import numpy as np
+
 from astropy import stats
 from astropy.wcs import WCS
 from astropy import units as u
@@ -101,15 +103,30 @@ def flipped_asymmetry(filename, data, header):
     Returns:
         dict: The dict containing the metrics.
     """
-    # Horizontal flip
-    data_flip = data[:, ::-1]
-    std_horizontal = (data - data_flip).std()
-    # Vertical flip
-    data_flip = data[::-1, :]
-    std_vertical = (data - data_flip).std()
+    std_horizontal = _flipped_difference_std(data, axis=1)
+    std_vertical = _flipped_difference_std(data, axis=0)
     return {"flip_asymm_h": std_horizontal, "flip_asymm_v": std_vertical}
 
 
+def _flipped_difference_std(data, axis):
+    """ Calculate the standard deviation of the data minus the data flipped along an axis.
+    The difference image is antisymmetric, so it has zero mean and its standard deviation can be
+    calculated using views of only half of the data, without making the full difference image.
+    Args:
+        data (np.array): The 2D data array.
+        axis (int): The axis along which to flip the data.
+    Returns:
+        float: The standard deviation of the difference image.
+    """
+    data = np.moveaxis(data, axis, 0)
+    half = data.shape[0] // 2
+
+    diff = data[:half] - data[::-1][:half]
+    sum_squares = np.square(diff, out=diff).sum(dtype="float64")
+
+    return np.sqrt(2 * sum_squares / data.size)
+
+
 def alt_az(filename, data, header):
     """ Get the alt az of the observation from the header.
     Args:
@@ -2,7 +2,6 @@ import os
 from collections import defaultdict
 
 import pandas as pd
-import matplotlib.pyplot as plt
 
 from huntsman.drp.utils import normalise_path, plotting
 from huntsman.drp.base import HuntsmanBase
@@ -89,7 +88,7 @@ class ReductionBase(HuntsmanBase):
         df = pd.read_csv(self._refcat_filename)
         ax.plot(df[ra_key].values, df[dec_key].values, "bo", markersize=1)
 
-        plt.savefig(os.path.join(self.directory, "plots", "refobjs.png"), bbox_inches="tight",
+        fig.savefig(os.path.join(self.directory, "plots", "refobjs.png"), bbox_inches="tight",
                     dpi=dpi)
 
     def make_reduce_plots(self):
@@ -13,6 +13,7 @@ class LsstReduction(ReductionBase):
 
         self._butler_directory = os.path.join(self.directory, "lsst")
         self._butler_repo = None
+        self._dataIds = {}  # Cache of document: dataId
 
         # Setup task configs
 
@@ -33,8 +34,8 @@ class LsstReduction(ReductionBase):
         if call_super:
             super().prepare()
 
-        # Ingest raw files into butler repository
-        self._butler_repo.ingest_raw_data([d["filename"] for d in self.science_docs])
+        # Ingest raw files into butler repository in a single call
+        self._butler_repo.ingest_raw_data(self._get_raw_filenames())
 
         # Ingest master calibs into butler repository
         for datasetType, docs in self.calib_docs.items():
@@ -46,7 +47,7 @@ class LsstReduction(ReductionBase):
     def reduce(self):
         """ Use the LSST stack to calibrate and stack exposures. """
 
-        dataIds = [self._butler_repo.document_to_dataId(d) for d in self.science_docs]
+        dataIds = [self._document_to_dataId(d) for d in self.science_docs]
 
         self.logger.info(f"Making calexps for {len(self.science_docs)} science images.")
         self._butler_repo.make_calexps(dataIds=dataIds, remake_existing=False,
@@ -57,6 +58,27 @@ class LsstReduction(ReductionBase):
 
     # Private methods
 
+    def _document_to_dataId(self, document):
+        """ Get the butler dataId for a document.
+        We cache the dataIds as the same documents are converted in several processing steps.
+        Args:
+            document (RawExposureDocument): The document to convert.
+        Returns:
+            dict: The corresponding dataId.
+        """
+        try:
+            return self._dataIds[document]
+        except KeyError:
+            self._dataIds[document] = self._butler_repo.document_to_dataId(document)
+        return self._dataIds[document]
+
+    def _get_raw_filenames(self):
+        """ Get the unique raw filenames to ingest into the butler repository.
+        Returns:
+            list of str: The sorted list of filenames.
+        """
+        return sorted({d["filename"] for d in self.science_docs})
+
     def _initialise(self):
         """ Override method to create the butler repository. """
         super()._initialise()
@@ -6,7 +6,6 @@ https://github.com/lsst/meas_algorithms/blob/master/python/lsst/meas/algorithms/
 NOTES:
   - RMS level used in source detection is measured from the image *not* the sky background
 """
-from copy import deepcopy
 from datetime import timedelta
 
 import numpy as np
@@ -32,18 +31,16 @@ class OffsetSkyReduction(LsstReduction):
         self._sky_query = sky_query
         self._timedelta_minutes = timedelta_minutes
 
-        self.sky_docs = {}
+        self.sky_docs = []  # Matching sky docs for each science doc, in the same order
 
         # Make sure required reduction kwargs are set for sky calexps
-        self._calexp_kwargs_sky = deepcopy(self._calexp_kwargs)
-        extra_config_sky = deepcopy(self._calexp_kwargs_sky.get("extra_config", {}))
-        extra_config_sky.update(EXTRA_CALEXP_CONFIG_SKY)
-        self._calexp_kwargs_sky["extra_config"] = extra_config_sky
+        # Only extra_config is modified so we only need to copy down to that level
+        extra_config = self._calexp_kwargs.get("extra_config", {})
+        self._calexp_kwargs_sky = {**self._calexp_kwargs,
+                                   "extra_config": {**extra_config, **EXTRA_CALEXP_CONFIG_SKY}}
 
         # Make sure required reduction kwargs are set for science calexps
-        extra_config = self._calexp_kwargs.get("extra_config", {})
-        extra_config.update(EXTRA_CALEXP_CONFIG)
-        self._calexp_kwargs["extra_config"] = extra_config
+        self._calexp_kwargs["extra_config"] = {**extra_config, **EXTRA_CALEXP_CONFIG}
 
         # We need to allow LSST to overwrite the existing config file
         self._calexp_kwargs["clobber_config"] = True
@@ -54,33 +51,28 @@ class OffsetSkyReduction(LsstReduction):
         # Use base prepare method to set science docs, calibs and make reference catalogue
         ReductionBase.prepare(self)
 
-        for doc in self.science_docs:
-            # Get background docs
-            self.sky_docs[doc] = self._get_matching_sky_docs(doc)
-
-            all_sky_docs = self._get_all_sky_docs()  # List rather than dict
+        # Get background docs
+        self.sky_docs = self._get_matching_sky_docs(self.science_docs)
 
-            # Update set of calibs so we can reduce the background docs
-            calib_docs = self._get_calibs(all_sky_docs)
-            for datasetType, docs in calib_docs.items():
-                self.calib_docs[datasetType].update(docs)
+        # Update set of calibs so we can reduce the background docs
+        calib_docs = self._get_calibs(self._get_all_sky_docs())
+        for datasetType, docs in calib_docs.items():
+            self.calib_docs[datasetType].update(docs)
 
-        # Ingest raw data, calibs and refcat
+        # Ingest raw data (including sky docs), calibs and refcat
         # Note: Only the science docs need a refcat because we don't need to calibrate the sky ones
         super().prepare(call_super=False)
 
-        # Ingest extra sky docs
-        self._butler_repo.ingest_raw_data([d["filename"] for d in all_sky_docs])
-
     def reduce(self):
         """ Override method to measure the offset sky backgrounds before processing. """
 
-        self.logger.info(f"Measuring sky backgrounds for {len(self.sky_docs)} sky offset images.")
+        n_sky = len(self._get_all_sky_docs())
+        self.logger.info(f"Measuring sky backgrounds for {n_sky} sky offset images.")
         self.measure_backgrounds()
 
         self.logger.info(f"Making master sky images for {len(self.science_docs)} science images.")
-        for doc in self.science_docs:
-            self.make_master_background(doc, self.sky_docs[doc])
+        for doc, sky_docs in zip(self.science_docs, self.sky_docs):
+            self.make_master_background(doc, sky_docs)
 
         super().reduce()
 
@@ -88,7 +80,7 @@ class OffsetSkyReduction(LsstReduction):
         """ Measure background for each sky image. """
 
         # Get dataIds to reduce
-        dataIds = [self._butler_repo.document_to_dataId(doc) for doc in self._get_all_sky_docs()]
+        dataIds = [self._document_to_dataId(doc) for doc in self._get_all_sky_docs()]
 
         # Process the dataIds
         self._butler_repo.make_calexps(dataIds=dataIds, **self._calexp_kwargs_sky)
@@ -97,16 +89,22 @@ class OffsetSkyReduction(LsstReduction):
         """ Get a master background image for the specific document and persist using butler. """
 
         # Get background images from LSST
-        bg_list = []
-        for doc in matching_sky_docs:
-            dataId = self._butler_repo.document_to_dataId(doc)
+        # Store them in a contiguous float32 stack to avoid copying / upcasting in the median
+        bg_stack = None
+        for i, doc in enumerate(matching_sky_docs):
+            dataId = self._document_to_dataId(doc)
             bg = self._butler_repo.get("calexpBackground", dataId=dataId, rerun=rerun)
 
             # Get the full-sized BG image as a np.array
-            bg_list.append(bg.getImage().getArray())
+            bg_array = bg.getImage().getArray()
+
+            if bg_stack is None:
+                bg_stack = np.empty((len(matching_sky_docs), *bg_array.shape), dtype="float32")
+            bg_stack[i] = bg_array
 
         # Combine the sky images
-        bg_master = np.median(bg_list, axis=1)
+        # The stack is not needed afterwards, so allow the median to work in-place
+        bg_master = np.median(bg_stack, axis=0, overwrite_input=True)
 
         # Package into an LSST-friendly object
         image = lsst.afw.image.ImageF(bg_master)
@@ -114,35 +112,51 @@ class OffsetSkyReduction(LsstReduction):
         exposure.setImage(image)
 
         # Use butler to persist the image using a custom datasetType (specified in policy)
-        dataId = self._butler_repo.document_to_dataId(document)
+        dataId = self._document_to_dataId(document)
         butler = self._butler_repo.get_butler(rerun=rerun)
         dataRef = butler.dataRef(datasetType="raw", dataId=dataId)
         dataRef.put(exposure, "offsetBackground")
 
-    def _get_matching_sky_docs(self, document):
-        """ Get list of documents to measure the offset sky background with.
+    def _get_matching_sky_docs(self, documents):
+        """ Get lists of documents to measure the offset sky background with.
+        One collection query is made per distinct date window, so documents that share a window
+        also share the query result.
         Args:
-            document (RawExposureDocument): The raw exposure document to match with.
+            documents (list of RawExposureDocument): The raw exposure documents to match with.
         Returns:
-            list of RawExposureDocument: The matching documents.
+            list of list of RawExposureDocument: The matching documents for each document.
         """
         td = timedelta(minutes=self._timedelta_minutes)
-        date_min = document["date"] - td
-        date_max = document["date"] + td
 
-        matches = self._exposure_collection.find(date_min=date_min, date_max=date_max,
-                                                 **self._sky_query)
+        matches_by_window = {}
+        matches_list = []
+        for document in documents:
 
-        if not matches:
-            raise RuntimeError(f"No matching offset sky images for {document}.")
+            window = (document["date"] - td, document["date"] + td)
+            try:
+                matches = matches_by_window[window]
+            except KeyError:
+                matches = self._exposure_collection.find(date_min=window[0], date_max=window[1],
+                                                         **self._sky_query)
+                matches_by_window[window] = matches
 
-        self.logger.debug(f"Found {len(matches)} matching offset sky images for {document}.")
+            if not matches:
+                raise RuntimeError(f"No matching offset sky images for {document}.")
 
-        return matches
+            self.logger.debug(f"Found {len(matches)} matching offset sky images for {document}.")
+            matches_list.append(matches)
+
+        return matches_list
+
+    def _get_raw_filenames(self):
+        """ Override to ingest the offset sky docs alongside the science docs.
+        Returns:
+            list of str: The sorted list of unique filenames.
+        """
+        filenames = set(super()._get_raw_filenames())
+        filenames.update([d["filename"] for d in self._get_all_sky_docs()])
+        return sorted(filenames)
 
     def _get_all_sky_docs(self):
-        """ Get all sky documents in a set rather than a nested dictionary. """
-        all_sky_docs = set()
-        for sky_docs in self.sky_docs.values():
-            all_sky_docs.update(sky_docs)
-        return all_sky_docs
+        """ Get all sky documents in a set rather than a nested list. """
+        return set().union(*self.sky_docs)
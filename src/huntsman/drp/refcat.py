@@ -2,10 +2,9 @@ import os
 import pickle
 import serpent
 from threading import Lock
-from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 
-import numpy as np
 import pandas as pd
 from astroquery.utils.tap.core import TapPlus
 from astropy.coordinates import SkyCoord
@@ -29,6 +28,12 @@ class TapReferenceCatalogue(HuntsmanBase):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
+        # Maximum number of concurrent TAP queries
+        self._max_workers = int(self.config["refcat"].get("max_workers", 8))
+
+        # Maximum number of cones to combine into a single TAP query
+        self._max_cones_per_query = int(self.config["refcat"].get("max_cones_per_query", 20))
+
         self._initialise()
 
     def _initialise(self):
@@ -44,49 +49,56 @@ class TapReferenceCatalogue(HuntsmanBase):
         self._tap_limit = self.config["refcat"].get("tap_limit", None)
         self._parameter_ranges = self.config["refcat"]["parameter_ranges"]
 
+        # Create the query templates, which are invariant between cone searches
+        self._cone_template = (f"1=CONTAINS(POINT('ICRS', {self._ra_key}, {self._dec_key}),"
+                               " CIRCLE('ICRS', {ra}, {dec}, {radius}))")
+        self._query_template = self._make_query_template()
+
         # Create the tap object
         self._tap = TapPlus(url=self._tap_url)
 
-    def cone_search(self, coord, filename, radius_degrees=None):
-        """ Query the reference catalogue, saving output to a .csv file.
+    def cone_search(self, coord, filename=None, radius_degrees=None):
+        """ Query the reference catalogue, optionally saving output to a .csv file.
         Args:
             coord (astropy.coordinates.SkyCoord): The central coordinate.
-            filename (str): Filename of the returned .csv file.
+            filename (str, optional): If provided, write the result to this .csv file.
             radius_degrees (float, optional): Override search radius from config.
         Returns:
             pd.DataFrame: The source catalogue.
         """
-        ra = coord.ra.to_value("deg")
-        dec = coord.dec.to_value("deg")
+        return self.cone_search_multi([coord], filename=filename, radius_degrees=radius_degrees)
 
+    def cone_search_multi(self, coords, filename=None, radius_degrees=None):
+        """ Query the reference catalogue around several coordinates using a single TAP query.
+        Sources inside more than one cone are only returned once. The result is transferred as a
+        binary VOTable and parsed in memory, which is much faster than writing and re-parsing a
+        CSV file.
+        Args:
+            coords (list of astropy.coordinates.SkyCoord): The central coordinates.
+            filename (str, optional): If provided, write the result to this .csv file.
+            radius_degrees (float, optional): Override search radius from config.
+        Returns:
+            pd.DataFrame: The source catalogue.
+        """
         if radius_degrees is None:
             radius_degrees = self._cone_search_radius
 
-        query = f"SELECT * FROM {self._tap_table}"
+        cones = " OR ".join([self._cone_template.format(ra=c.ra.to_value("deg"),
+                                                        dec=c.dec.to_value("deg"),
+                                                        radius=radius_degrees) for c in coords])
 
-        # Apply cone search
-        query += (f" WHERE 1=CONTAINS(POINT('ICRS', {self._ra_key}, {self._dec_key}),"
-                  f" CIRCLE('ICRS', {ra}, {dec}, {radius_degrees}))")
-
-        # Apply parameter ranges
-        for param, prange in self._parameter_ranges.items():
-            with suppress(KeyError):
-                query += f" AND {param} >= {prange['lower']}"
-            with suppress(KeyError):
-                query += f" AND {param} < {prange['upper']}"
-            with suppress(KeyError):
-                query += f" AND {param} = {prange['equal']}"
-
-        # Apply limit on number of returned rows
-        if self._tap_limit is not None:
-            query += f" LIMIT {int(self._tap_limit)}"
+        query = self._query_template.format(cones=cones)
 
         # Start the query
         self.logger.debug(f"Cone search command: {query}.")
 
-        self._tap.launch_job_async(query, dump_to_file=True, output_format="csv",
-                                   output_file=filename)
-        return pd.read_csv(filename)
+        job = self._tap.launch_job_async(query, dump_to_file=False, output_format="votable")
+        df = job.get_results().to_pandas()
+
+        if filename is not None:
+            df.to_csv(filename)
+
+        return df
 
     def make_reference_catalogue(self, coords, filename=None, **kwargs):
         """ Create the master reference catalogue with no source duplications.
@@ -97,23 +109,24 @@ class TapReferenceCatalogue(HuntsmanBase):
         Returns:
             pandas.DataFrame: The reference catalogue.
         """
-        result = None
-
-        with NamedTemporaryFile(delete=True) as tempfile:
-            for coord in coords:
-
-                # Do the cone search and get result
-                df = self.cone_search(coord, filename=tempfile.name, **kwargs)
-
-                # First iteration
-                if result is None:
-                    result = df
-                    continue
-
-                # Remove existing sources & concat
-                is_new = np.isin(df[self._unique_key].values, result[self._unique_key].values,
-                                 invert=True)
-                result = pd.concat([result, df[is_new]], ignore_index=False)
+        # Combine the cones into batches to reduce the number of round trips to the TAP server
+        coords = list(coords)
+        n = self._max_cones_per_query
+        batches = [coords[i:i + n] for i in range(0, len(coords), n)]
+
+        # Do the queries concurrently as they are I/O bound
+        # Results are collected in order so that duplicate removal is deterministic
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = [executor.submit(self.cone_search_multi, b, **kwargs) for b in batches]
+            dfs = [future.result() for future in futures]
+
+        # Concat & remove duplicate sources in a single pass
+        result = pd.concat(dfs, ignore_index=True)
+        result = result.drop_duplicates(subset=self._unique_key, keep="first")
+
+        # The row limit applies to the whole catalogue, not to each of the batched queries
+        if self._tap_limit is not None:
+            result = result.iloc[:int(self._tap_limit)]
 
         self.logger.debug(f"{result.shape[0]} sources in reference catalogue.")
 
@@ -123,6 +136,32 @@ class TapReferenceCatalogue(HuntsmanBase):
 
         return result
 
+    def _make_query_template(self):
+        """ Make the cone search query template.
+        Returns:
+            str: The query string with a format field for the cone search constraints.
+        """
+        query = f"SELECT * FROM {self._tap_table}"
+
+        # Apply cone search
+        query += " WHERE ({cones})"
+
+        # Apply parameter ranges
+        for param, prange in self._parameter_ranges.items():
+            with suppress(KeyError):
+                query += f" AND {param} >= {prange['lower']}"
+            with suppress(KeyError):
+                query += f" AND {param} < {prange['upper']}"
+            with suppress(KeyError):
+                query += f" AND {param} = {prange['equal']}"
+
+        # Apply limit on number of returned rows
+        # No single query needs more rows than the limit on the combined catalogue
+        if self._tap_limit is not None:
+            query += f" LIMIT {int(self._tap_limit)}"
+
+        return query
+
 
 class TestingTapReferenceCatalogue(TapReferenceCatalogue):
 
@@ -134,7 +173,7 @@ class TestingTapReferenceCatalogue(TapReferenceCatalogue):
 
         super().__init__(*args, **kwargs)
 
-    def cone_search(self, *args, **kwargs):
+    def cone_search_multi(self, *args, **kwargs):
         return pd.read_csv(self._refcat_filename)
 
     def _initialise(self):
@@ -169,7 +208,7 @@ class RefcatServer(HuntsmanBase):
 
         # Pickle the data and return it as a bytes object
         # This sends an encoded version over the network and may not be advisable for large files
-        return pickle.dumps(df)
+        return pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
 
 
 class RefcatClient(HuntsmanBase):
@@ -8,68 +8,81 @@ Features:
 - Minimal CPU downtime.
 """
 import gc
-import time
 import atexit
 import queue
 from functools import partial
-from threading import Thread
+from threading import Thread, Lock
 from contextlib import suppress
-from multiprocessing import Pool
-from multiprocessing import JoinableQueue as Queue
+from multiprocessing import Pool, Queue, Event
+from multiprocessing.pool import ThreadPool
 from abc import ABC, abstractmethod
 
-from panoptes.utils.time import CountdownTimer
-
 from huntsman.drp.base import HuntsmanBase
 from huntsman.drp.collection import RawExposureCollection, MasterCalibCollection
 
 
-def _wrap_process_func(i, func):
+def _wrap_process_func(i, func, batch_size=1, gc_interval=16):
     """ Get objects from the input queue and process them, putting results in output queue.
+    Objects are taken from the input queue in batches and the results of each batch are put into
+    the output queue together, which reduces the number of (locking) queue operations.
     Args:
         i (int): Dummy variable used to start the pool.
         func (Function): Function used to process the object.
+        batch_size (int, optional): The maximum number of objects to process per batch. Default 1.
+        gc_interval (int, optional): Do an explicit full garbage collection after this many
+            batches. Default 16.
     """
     global exposure_collection
     global input_queue
     global output_queue
-    global stop_queue
+    global stop_event
 
     logger = exposure_collection.logger
+    n_batches = 0
 
-    while True:
-
-        # Check if we should break out of the loop
-        with suppress(queue.Empty):
-            stop_queue.get_nowait()
-            break
+    # Check if we should break out of the loop
+    while not stop_event.is_set():
 
         # Get an object from the queue
         try:
-            obj = input_queue.get(timeout=1)
+            objs = [input_queue.get(timeout=1)]
         except queue.Empty:
             continue
 
-        # Process the object
-        success = True
-        try:
-            func(obj, calib_collection=calib_collection, exposure_collection=exposure_collection)
-        except Exception as err:
-            logger.error(f"Exception while processing {obj}: {err!r}")
-            success = False
+        # Drain any other objects that are immediately available, up to the batch size
+        while len(objs) < batch_size:
+            try:
+                objs.append(input_queue.get_nowait())
+            except queue.Empty:
+                break
 
-        # Apparently putting exceptions into the queue causes problems (hanging on get)
-        # So return a boolean value to indicate success
-        result = {"obj": obj, "success": success}
+        # Process the objects
+        results = []
+        for obj in objs:
+            success = True
+            try:
+                func(obj, calib_collection=calib_collection,
+                     exposure_collection=exposure_collection)
+            except Exception as err:
+                logger.error(f"Exception while processing {obj}: {err!r}")
+                success = False
 
-        # Put the result in the output queue
-        output_queue.put(result)
+            # Apparently putting exceptions into the queue causes problems (hanging on get)
+            # So return a boolean value to indicate success
+            results.append({"obj": obj, "success": success})
+
+        # Put the results in the output queue
+        output_queue.put(results)
 
         # Explicit garbage collection
-        gc.collect()
+        # A full collection can be slow, so only do it periodically to prevent memory growth
+        n_batches += 1
+        if n_batches % gc_interval == 0:
+            gc.collect()
 
 
-def _init_pool(function, config, in_queue, out_queue, stp_queue):
+def _init_pool(function, config, in_queue, out_queue, stp_event, exp_collection=None,
+               cal_collection=None):
     """ Initialise the process pool.
     This function is required because we need to share the queue objects with each process and
     they cannot be parsed directly. Additionally create Collection objects here so that they do not
@@ -79,32 +92,42 @@ def _init_pool(function, config, in_queue, out_queue, stp_queue):
         config (dict): The config.
         in_queue (Queue): The input queue.
         out_queue (Queue): The output queue.
-        stp_queue (Queue): The queue used to send the stop messages.
+        stp_event (Event): The event used to signal the processes to stop.
+        exp_collection (RawExposureCollection, optional): The exposure collection to use. If None
+            (default), a new one is created.
+        cal_collection (MasterCalibCollection, optional): The calib collection to use. If None
+            (default), a new one is created.
     """
     # Declare global objects
     global exposure_collection
     global calib_collection
     global input_queue
     global output_queue
-    global stop_queue
+    global stop_event
 
     # Assign global objects
     input_queue = in_queue
     output_queue = out_queue
-    stop_queue = stp_queue
+    stop_event = stp_event
 
-    exposure_collection = RawExposureCollection(config=config)
+    if exp_collection is None:
+        exp_collection = RawExposureCollection(config=config)
+    exposure_collection = exp_collection
 
-    calib_collection = MasterCalibCollection(config=config)
+    if cal_collection is None:
+        cal_collection = MasterCalibCollection(config=config)
+    calib_collection = cal_collection
 
 
 class ProcessQueue(HuntsmanBase, ABC):
     """ Abstract class to process queued objects in parallel. """
 
     _pool_class = Pool  # Allow class overrides
+    _queue_class = Queue
 
     def __init__(self, exposure_collection=None, calib_collection=None, queue_interval=300,
-                 status_interval=30, nproc=None, directory=None, *args, **kwargs):
+                 status_interval=30, nproc=None, directory=None, batch_size=1, gc_interval=16,
+                 *args, **kwargs):
         """
         Args:
             queue_interval (float): The amout of time to sleep in between checking for new
@@ -115,27 +138,38 @@ class ProcessQueue(HuntsmanBase, ABC):
                 be added to the relevant datatable.
             nproc (int): The number of processes to use. If None (default), will check the config
                 item `screener.nproc` with a default value of 1.
+            batch_size (int, optional): The maximum number of queued objects each process takes
+                at once. Larger batches mean fewer queue operations but coarser load balancing.
+                Default 1.
+            gc_interval (int, optional): The number of batches each process handles between
+                explicit garbage collections. Default 16.
             *args, **kwargs: Parsed to HuntsmanBase initialiser.
         """
         super().__init__(*args, **kwargs)
 
         self._nproc = 1 if not nproc else int(nproc)
+        self._batch_size = int(batch_size)
+        self._gc_interval = max(1, int(gc_interval))
 
-        # Setup the exposure collections
+        # Setup the collections
         if exposure_collection is None:
             exposure_collection = RawExposureCollection(config=self.config, logger=self.logger)
+        self.exposure_collection = exposure_collection
 
-        # Setup the collections
-        self.exposure_collection = RawExposureCollection(config=self.config, logger=self.logger)
+        if calib_collection is None:
+            calib_collection = MasterCalibCollection(config=self.config, logger=self.logger)
+        self.calib_collection = calib_collection
+
+        # Shared with the pool processes so they can be stopped without a queue round trip
+        self._stop_event = Event()
 
         # Sleep intervals
         self._queue_interval = queue_interval
         self._status_interval = status_interval
 
         # Make queues
-        self._input_queue = Queue()
-        self._output_queue = Queue()
-        self._stop_queue = Queue()
+        self._input_queue = self._queue_class()
+        self._output_queue = self._queue_class()
 
         # Setup threads
         self._status_thread = Thread(target=self._async_monitor_status)
@@ -146,8 +180,8 @@ class ProcessQueue(HuntsmanBase, ABC):
         # Starting values
         self._n_processed = 0
         self._n_failed = 0
-        self._stop = False
         self._queued_objs = set()
+        self._queued_objs_lock = Lock()  # Shared between the queue and process threads
 
         atexit.register(self.stop)  # This gets called when python is quit
 
@@ -180,7 +214,7 @@ class ProcessQueue(HuntsmanBase, ABC):
     def start(self):
         """ Start the service. """
         self.logger.info(f"Starting {self}.")
-        self._stop = False
+        self._stop_event.clear()
         for thread in self._threads:
             thread.start()
 
@@ -190,10 +224,7 @@ class ProcessQueue(HuntsmanBase, ABC):
             blocking (bool, optional): If True (default), blocks until all threads have joined.
         """
         self.logger.info(f"Stopping {self}.")
-        self._stop = True
-
-        for _ in range(self._nproc):
-            self._stop_queue.put("stop")
+        self._stop_event.set()
 
         if blocking:
             for thread in self._threads:
@@ -213,10 +244,7 @@ class ProcessQueue(HuntsmanBase, ABC):
         """ Report the status on a regular interval. """
         self.logger.debug("Starting status thread.")
 
-        while True:
-            if self._stop:
-                self.logger.debug("Stopping status thread.")
-                break
+        while not self._stop_event.is_set():
 
             # Get the current status
             status = self.status
@@ -224,12 +252,8 @@ class ProcessQueue(HuntsmanBase, ABC):
             if not self.is_running:
                 self.logger.warning(f"{self} is not running.")
 
-            # Sleep before reporting status again
-            timer = CountdownTimer(duration=self._status_interval)
-            while not timer.expired():
-                if self._stop:
-                    break
-                time.sleep(1)
+            # Sleep before reporting status again, returning immediately if stopped
+            self._stop_event.wait(timeout=self._status_interval)
 
         self.logger.debug("Status thread stopped.")
 
@@ -237,26 +261,22 @@ class ProcessQueue(HuntsmanBase, ABC):
         """ Add new objs to the queue. """
         self.logger.debug("Starting queue thread.")
 
-        while True:
-            if self._stop:
-                self.logger.debug("Stopping queue thread.")
-                break
+        while not self._stop_event.is_set():
 
             objs_to_process = self._get_objs()
 
             # Update files to process
+            # Make sure queue objs are unique by only adding ones that are not already queued
             self.logger.debug("Adding new objects to queue.")
-            for obj in objs_to_process:
+            with self._queued_objs_lock:
+                new_objs = set(objs_to_process) - self._queued_objs
+                self._queued_objs.update(new_objs)
 
-                if obj not in self._queued_objs:  # Make sure queue objs are unique
-                    self._queued_objs.add(obj)
-                    self._input_queue.put(obj)
+            for obj in new_objs:
+                self._input_queue.put(obj)
 
-            timer = CountdownTimer(duration=self._queue_interval)
-            while not timer.expired():
-                if self._stop:
-                    break
-                time.sleep(1)
+            # Sleep before queuing new objects, returning immediately if stopped
+            self._stop_event.wait(timeout=self._queue_interval)
 
         self.logger.debug("Queue thread stopped.")
 
@@ -268,21 +288,29 @@ class ProcessQueue(HuntsmanBase, ABC):
         """
         self.logger.debug(f"Starting processing with {self._nproc} processes.")
 
-        wrapped_func = partial(_wrap_process_func, func=process_func)
+        wrapped_func = partial(_wrap_process_func, func=process_func,
+                               batch_size=self._batch_size, gc_interval=self._gc_interval)
 
         pool_init_args = (wrapped_func,
                           self.config,
                           self._input_queue,
                           self._output_queue,
-                          self._stop_queue)
+                          self._stop_event)
+
+        # Threads can share the existing collections as pymongo clients are thread-safe
+        # Processes must make their own as pymongo clients are not fork-safe
+        if issubclass(self._pool_class, ThreadPool):
+            pool_init_args += (self.exposure_collection, self.calib_collection)
 
         # Avoid Pool context manager to make multiprocessing coverage work
         pool = self._pool_class(self._nproc, initializer=_init_pool, initargs=pool_init_args)
 
         try:
-            pool.map_async(wrapped_func, range(self._nproc))
+            # Start one long-running worker per process, each of which drains the input queue
+            for i in range(self._nproc):
+                pool.apply_async(wrapped_func, (i,))
 
-            while not (self._stop and self._output_queue.empty()):
+            while not (self._stop_event.is_set() and self._output_queue.empty()):
                 self._process_results()
 
             self.logger.debug("Terminating process pool.")
@@ -293,23 +321,24 @@ class ProcessQueue(HuntsmanBase, ABC):
         self.logger.debug("Process thread stopped.")
 
     def _process_results(self):
-        """ Process the results in the output queue. """
+        """ Process a batch of results in the output queue. """
 
         try:
-            result = self._output_queue.get(timeout=1)
+            results = self._output_queue.get(timeout=1)
         except queue.Empty:
             return
 
-        obj = result["obj"]
-        success = result["success"]
+        for result in results:
+
+            obj = result["obj"]
+            success = result["success"]
 
-        success_or_fail = "success" if success else "fail"
-        self.logger.info(f"Finished processing {obj} ({success_or_fail}).")
+            success_or_fail = "success" if success else "fail"
+            self.logger.info(f"Finished processing {obj} ({success_or_fail}).")
 
-        self._n_processed += 1
-        if not success:
-            self._n_failed += 1
+            self._n_processed += 1
+            if not success:
+                self._n_failed += 1
 
-        self._input_queue.task_done()
-        self._output_queue.task_done()
-        self._queued_objs.remove(obj)
+            with self._queued_objs_lock:
+                self._queued_objs.remove(obj)
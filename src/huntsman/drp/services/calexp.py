@@ -1,7 +1,13 @@
+import os
+import shutil
 import tempfile
+from queue import SimpleQueue
+from threading import Lock
 from functools import partial
+from collections import OrderedDict
 from multiprocessing.pool import ThreadPool
 
+from huntsman.drp.base import HuntsmanBase
 from huntsman.drp.services.base import ProcessQueue
 from huntsman.drp.lsst.butler import TemporaryButlerRepository
 from huntsman.drp.refcat import RefcatClient
@@ -13,10 +19,98 @@ from huntsman.drp.metrics.calexp import calculate_metrics
 CALEXP_METRIC_TRIGGER = "CALEXP_METRIC_TRIGGER"
 
 
-def _process_document(document, exposure_collection, calib_collection, timeout, **kwargs):
+class RefcatCache(HuntsmanBase):
+    """ Cache of reference catalogue files so that exposures close to previously processed
+    exposures do not require new reference catalogue queries. Each cached catalogue covers a cone
+    that is larger than the usual search radius by a margin, so it can be reused by any exposure
+    whose centre is within the margin of the cached centre.
+
+    NOTE: If refcat.tap_limit is set in the config, it also caps the number of sources in the
+    wider cached cone. A cached catalogue can therefore contain fewer sources inside a given
+    exposure's own cone than a direct query would. Set refcat_cache_margin to 0 to only reuse
+    catalogues for exposures with the same centre.
+    """
+
+    def __init__(self, margin=0.5, max_size=100, *args, **kwargs):
+        """
+        Args:
+            margin (float, optional): The extra search radius in degrees. Default: 0.5.
+            max_size (int, optional): The maximum number of cached catalogues. Default: 100.
+            *args, **kwargs: Parsed to HuntsmanBase initialiser.
+        """
+        super().__init__(*args, **kwargs)
+
+        self._radius = self.config["refcat"]["cone_search_radius"]
+        self._margin = margin
+        self._max_size = max_size
+
+        # Use the configured temporary directory if there is one, else the system default
+        tmp_dir = self.config["directories"].get("tmp")
+        if tmp_dir is not None:
+            os.makedirs(tmp_dir, exist_ok=True)
+        self._directory = tempfile.mkdtemp(prefix="refcat_cache_", dir=tmp_dir)
+        self._entries = OrderedDict()  # Cached filename: central coordinate, oldest first
+        self._lock = Lock()
+        self._count = 0
+
+    def get(self, document, refcat_client, filename):
+        """ Write a reference catalogue that covers the document to a file, using a cached
+        catalogue if possible.
+        Args:
+            document (RawExposureDocument): The document.
+            refcat_client (RefcatClient): The refcat client used to make new catalogues.
+            filename (str): The filename of the reference catalogue.
+        """
+        coord = document.get_central_skycoord()
+
+        with self._lock:
+            for cached_filename, centre in self._entries.items():
+                if centre.separation(coord).to_value("deg") <= self._margin:
+                    self.logger.debug(f"Using cached reference catalogue for {document}.")
+                    self._entries.move_to_end(cached_filename)
+                    self._link(cached_filename, filename)
+                    return
+
+            self._count += 1
+            cached_filename = os.path.join(self._directory, f"refcat_{self._count}.csv")
+
+        # Make the reference catalogue outside of the lock as this is slow
+        refcat_client.make_reference_catalogue(coords=[coord], filename=cached_filename,
+                                               radius_degrees=self._radius + self._margin)
+
+        with self._lock:
+            self._entries[cached_filename] = coord
+            self._link(cached_filename, filename)
+
+            # Remove the least recently used catalogues
+            while len(self._entries) > self._max_size:
+                old_filename, _ = self._entries.popitem(last=False)
+                os.remove(old_filename)
+
+    def cleanup(self):
+        """ Remove all cached reference catalogues and the cache directory. """
+        with self._lock:
+            self._entries.clear()
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _link(self, cached_filename, filename):
+        """ Link the cached file to the filename so it is kept even if removed from the cache.
+        Args:
+            cached_filename (str): The cached filename.
+            filename (str): The filename to link to.
+        """
+        try:
+            os.link(cached_filename, filename)
+        except OSError:
+            shutil.copy(cached_filename, filename)
+
+
+def _process_document(document, exposure_collection, calib_collection, timeout, refcat_cache,
+                      **kwargs):
     """ Create a calibrated exposure (calexp) for the given data ID and store the metadata.
     Args:
         document (RawExposureDocument): The document to process.
+        refcat_cache (RefcatCache): The cache used to get the reference catalogue.
     """
     config = exposure_collection.config
     logger = calib_collection.logger
@@ -60,10 +154,11 @@ def _process_document(document, exposure_collection, calib_collection, timeout,
         logger.debug(f"Making refcat for {document}")
         refcat_client = RefcatClient(config=config, logger=logger)
 
-        with tempfile.NamedTemporaryFile(prefix=directory_prefix) as tf:
+        with tempfile.TemporaryDirectory(prefix=directory_prefix) as tempdir:
+            refcat_filename = os.path.join(tempdir, "refcat.csv")
             try:
-                # Download the refcat to the tempfile
-                refcat_client.make_from_documents([document], filename=tf.name)
+                # Get the refcat from the cache or download it
+                refcat_cache.get(document, refcat_client=refcat_client, filename=refcat_filename)
             except Exception as err:
                 logger.error(f"Exception while making refcat for {document}: {err!r}")
                 raise err
@@ -73,7 +168,7 @@ def _process_document(document, exposure_collection, calib_collection, timeout,
                 # TODO: Parse refcat client as function arg?
                 refcat_client._proxy._pyroRelease()
 
-            br.ingest_reference_catalogue([tf.name])
+            br.ingest_reference_catalogue([refcat_filename])
 
         # Make the calexp
         logger.debug(f"Making calexp for {document}")
@@ -95,7 +190,12 @@ class CalexpQualityMonitor(ProcessQueue):
     """ Class to continually evauate and archive calexp quality metrics for raw exposures that
     have not already been processed. Intended to run as a docker service.
     """
-    _pool_class = ThreadPool  # Use ThreadPool as LSST code makes its own subprocesses
+    # Use ThreadPool as LSST code makes its own subprocesses
+    # NOTE: Only the subprocess calls (e.g. calib ingestion) and the refcat download (socket I/O)
+    # release the GIL. The in-process LSST calls (e.g. make_calexp) mostly do not, so nproc > 1
+    # mainly helps to overlap the I/O-bound steps with processing.
+    _pool_class = ThreadPool
+    _queue_class = SimpleQueue  # Threads do not need inter-process queues
 
     def __init__(self, nproc=None, timeout=None, *args, **kwargs):
         """
@@ -116,33 +216,38 @@ class CalexpQualityMonitor(ProcessQueue):
         # Specify timeout for calexp processing
         self._timeout = timeout if timeout is not None else calexp_config.get("timeout", None)
 
+        # Reference catalogues are reused between nearby exposures
+        self._refcat_cache = RefcatCache(
+            margin=float(calexp_config.get("refcat_cache_margin", 0.5)),
+            max_size=int(calexp_config.get("refcat_cache_size", 100)),
+            config=self.config, logger=self.logger)
+
+    def stop(self, blocking=True, *args, **kwargs):
+        """ Override to remove the cached reference catalogues once the service has stopped.
+        Args:
+            blocking (bool, optional): If True (default), blocks until all threads have joined.
+            *args, **kwargs: Parsed to super().stop.
+        """
+        super().stop(blocking=blocking, *args, **kwargs)
+
+        # The cache can only be removed once nothing is using it
+        if blocking:
+            self._refcat_cache.cleanup()
+
     def _async_process_objects(self, *args, **kwargs):
         """ Continually process objects in the queue. """
 
-        func = partial(_process_document, timeout=self._timeout)
+        func = partial(_process_document, timeout=self._timeout,
+                       refcat_cache=self._refcat_cache)
 
         return super()._async_process_objects(process_func=func)
 
     def _get_objs(self):
-        """ Update the set of data IDs that require processing. """
-        docs = self.exposure_collection.find({"dataType": "science"}, screen=True,
-                                             quality_filter=True)
-        return [d for d in docs if self._requires_processing(d)]
-
-    def _requires_processing(self, document):
-        """ Check if a document requires processing.
-        Args:
-            document (Document): The document to check.
-        Returns:
-            bool: True if processing required, else False.
+        """ Update the set of data IDs that require processing.
+        Processing is required unless the calexp trigger metric is False. This is evaluated by the
+        DB so that documents not requiring processing are not transferred.
         """
-        if "metrics" not in document:
-            return True
-
-        if "calexp" not in document["metrics"]:
-            return True
-
-        if CALEXP_METRIC_TRIGGER not in document["metrics"]["calexp"]:
-            return True
+        document_filter = {"dataType": "science",
+                           f"metrics.calexp.{CALEXP_METRIC_TRIGGER}": {"not_equal": False}}
 
-        return bool(document["metrics"]["calexp"][CALEXP_METRIC_TRIGGER])
+        return self.exposure_collection.find(document_filter, screen=True, quality_filter=True)
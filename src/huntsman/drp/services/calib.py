@@ -1,13 +1,11 @@
 """ Continually produce, update and archive master calibs. """
 import os
-import time
 import datetime
-from threading import Thread
-
-from panoptes.utils.time import CountdownTimer
+from collections import defaultdict
+from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor
 
 from huntsman.drp.base import HuntsmanBase
-from huntsman.drp.utils.date import date_to_ymd
 from huntsman.drp.collection import RawExposureCollection, MasterCalibCollection
 from huntsman.drp.lsst.butler import TemporaryButlerRepository
 
@@ -32,6 +30,9 @@ class MasterCalibMaker(HuntsmanBase):
         self._max_docs_per_calib = calib_maker_config.get("max_docs_per_calib", None)
         self._nproc = int(nproc if nproc else calib_maker_config.get("nproc", 1))
 
+        # Number of threads used to concurrently check which calibs need processing (I/O bound)
+        self._max_workers = int(calib_maker_config.get("max_workers", 4 * self._nproc))
+
         # Create collection client objects
         if exposure_collection is None:
             exposure_collection = RawExposureCollection(config=self.config, logger=self.logger)
@@ -41,8 +42,12 @@ class MasterCalibMaker(HuntsmanBase):
             calib_collection = MasterCalibCollection(config=self.config, logger=self.logger)
         self._calib_collection = calib_collection
 
+        # Caches that are refreshed for each calib date
+        self._dir_listings = {}  # Directory name: set of filenames
+        self._matching_raw_docs = {}  # Calib doc: matching raw docs
+
         # Create threads
-        self._stop_threads = False
+        self._stop_event = Event()
         self._calib_thread = Thread(target=self._run)
 
     # Properties
@@ -60,7 +65,7 @@ class MasterCalibMaker(HuntsmanBase):
     def start(self):
         """ Start the asynchronous calib processing loop. """
         self.logger.info("Starting master calib maker.")
-        self._stop_threads = False
+        self._stop_event.clear()
         self._calib_thread.start()
 
     def stop(self):
@@ -68,7 +73,7 @@ class MasterCalibMaker(HuntsmanBase):
         Note that this will block until any ongoing processing has finished.
         """
         self.logger.info("Stopping master calib maker.")
-        self._stop_threads = True
+        self._stop_event.set()
         try:
             self._calib_thread.join()
             self.logger.info("Calib maker stopped.")
@@ -80,6 +85,10 @@ class MasterCalibMaker(HuntsmanBase):
         Args:
             calib_date (object): The calib date.
         """
+        # Files and documents may have changed since the last calib date was processed
+        self._dir_listings = {}
+        self._matching_raw_docs = {}
+
         # Get set of all unique calib IDs from the raw calibs
         # Note these calib docs are not necessarily present in the DB
         calib_docs = self._exposure_collection.get_calib_docs(calib_date=calib_date,
@@ -92,9 +101,8 @@ class MasterCalibMaker(HuntsmanBase):
             return
 
         # Get set of raw calibs that need processing
-        raw_docs_to_process = set()
-        for calib_doc in calibs_to_process:
-            raw_docs_to_process.update(self._get_matching_raw_docs(calib_doc))
+        raw_docs_to_process = set().union(*[self._get_matching_raw_docs(calib_doc)
+                                            for calib_doc in calibs_to_process])
 
         self.logger.info(f"Raw documents to process: {len(raw_docs_to_process)}.")
 
@@ -114,18 +122,15 @@ class MasterCalibMaker(HuntsmanBase):
 
             for calib_date in calib_dates:
 
-                if self._stop_threads:
+                if self._stop_event.is_set():
                     return
 
                 self.logger.info(f"Processing calibs for calib_date={calib_date}.")
                 self.process_date(calib_date)
 
             self.logger.info(f"Finished processing calib dates. Sleeping for {sleep} seconds.")
-            timer = CountdownTimer(duration=sleep)
-            while not timer.expired():
-                if self._stop_threads:
-                    return
-                time.sleep(1)
+            if self._stop_event.wait(timeout=sleep):
+                return
 
     def _should_process(self, calib_doc, ignore_date=False):
         """ Check if the given calib_doc should be processed based on existing raw data.
@@ -150,15 +155,38 @@ class MasterCalibMaker(HuntsmanBase):
             return True
 
         # If the file doesn't exist, we need to make it
-        if not os.path.isfile(full_calib_doc["filename"]):
+        if not self._isfile(full_calib_doc["filename"]):
             return True
 
-        if any([r["date_modified"] >= full_calib_doc["date_modified"] for r in raw_docs]):
+        # If any raw files have been modified since the calib was made, we need to remake it
+        calib_date_modified = full_calib_doc["date_modified"]
+        if any(r["date_modified"] >= calib_date_modified for r in raw_docs):
             return True
 
         # If there are no new files contributing to this existing calib, we can skip it
         return False
 
+    def _isfile(self, filename):
+        """ Check if a file exists using cached directory listings.
+        Each directory is scanned once per calib date rather than calling stat for every file.
+        Args:
+            filename (str): The filename.
+        Returns:
+            bool: True if the file exists, else False.
+        """
+        dirname, basename = os.path.split(filename)
+        try:
+            filenames = self._dir_listings[dirname]
+        except KeyError:
+            try:
+                with os.scandir(dirname) as it:
+                    filenames = {e.name for e in it if e.is_file()}
+            except FileNotFoundError:
+                filenames = set()
+            self._dir_listings[dirname] = filenames
+
+        return basename in filenames
+
     def _get_calib_sets(self, calib_docs):
         """ Identify which calib IDs need processing and which should be ingested.
         Args:
@@ -170,12 +198,17 @@ class MasterCalibMaker(HuntsmanBase):
         calibs_to_process = set()
         calibs_to_ingest = set()
 
+        # Check which calibs should be processed concurrently as this is dominated by DB queries
+        calib_docs = list(calib_docs)
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            should_process = dict(zip(calib_docs, executor.map(self._should_process, calib_docs)))
+
         for calib_doc in calib_docs:
             if calib_doc in calibs_to_process:
                 continue
 
             # Check if we should process this calib
-            if self._should_process(calib_doc):
+            if should_process[calib_doc]:
 
                 # Find all dependent calibs that need to be recreated
                 calib_docs_dep = [d for d in self._get_dependent_calibs(calib_doc) if
@@ -196,6 +229,21 @@ class MasterCalibMaker(HuntsmanBase):
 
     def _get_matching_raw_docs(self, calib_doc):
         """ Get matchig raw exposure docs for a particular calib.
+        Results are cached until the next call to self.process_date.
+        Args:
+            calib_doc (CalibDocument): The calib document.
+        Returns:
+            list of RawExposureDocument: The matching raw exposure documents.
+        """
+        try:
+            return self._matching_raw_docs[calib_doc]
+        except KeyError:
+            docs = self._find_matching_raw_docs(calib_doc)
+            self._matching_raw_docs[calib_doc] = docs
+            return docs
+
+    def _find_matching_raw_docs(self, calib_doc):
+        """ Query the exposure collection for matching raw exposure docs for a particular calib.
         Args:
             calib_doc (CalibDocument): The calib document.
         Returns:
@@ -219,10 +267,9 @@ class MasterCalibMaker(HuntsmanBase):
     def _get_unique_dates(self):
         """ Get all calib dates specified by files in the raw data table.
         Returns:
-            set of datetime: The list of dates.
+            set of str: The dates in YYYY-MM-DD format.
         """
-        dates = self._exposure_collection.find(key="date", screen=True, quality_filter=True)
-        return set([date_to_ymd(d) for d in dates])
+        return self._exposure_collection.find_unique_dates_ymd(screen=True, quality_filter=True)
 
     def _get_dependent_calibs(self, calib_doc):
         """ Get all dependent calibs for a calib doc.
@@ -277,10 +324,13 @@ class MasterCalibMaker(HuntsmanBase):
             # Ingest raw exposures
             br.ingest_raw_data([_["filename"] for _ in raw_docs_to_process])
 
-            # Ingest existing master calibs
+            # Ingest existing master calibs, bucketing filenames by type in a single pass
+            filenames_by_type = defaultdict(list)
+            for calib_doc in calibs_to_ingest:
+                filenames_by_type[calib_doc["datasetType"]].append(calib_doc["filename"])
             for calib_type in self._ordered_calib_types:
-                fns = [c["filename"] for c in calibs_to_ingest if c["datasetType"] == calib_type]
-                br.ingest_master_calibs(calib_type, filenames=fns, validity=self._validity.days)
+                br.ingest_master_calibs(calib_type, filenames=filenames_by_type[calib_type],
+                                        validity=self._validity.days)
 
             # Make master calibs
             # NOTE: Implicit error handling
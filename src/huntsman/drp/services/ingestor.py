@@ -3,11 +3,13 @@ from copy import deepcopy
 
 from huntsman.drp.collection import RawExposureCollection
 from huntsman.drp.services.base import ProcessQueue
-from huntsman.drp.fitsutil import FitsHeaderTranslator, read_fits_header, read_fits_data
+from huntsman.drp.fitsutil import FitsHeaderTranslator, read_fits_header_and_data
 from huntsman.drp.utils import load_module
 from huntsman.drp.metrics.raw import RAW_METRICS
 from huntsman.drp.utils.ingest import METRIC_SUCCESS_FLAG, list_fits_files_recursive
 
+_METRIC_FUNCS = {}  # Cache of metric name: metric function
+
 
 def ingest_file(filename, config=None):
     """ Convenience function to easily ingest one file.
@@ -57,6 +59,21 @@ def _process_file(filename, metric_names, exposure_collection, **kwargs):
         raise RuntimeError(f"Metric evaluation unsuccessful for {filename}.")
 
 
+def _get_metric_func(metric):
+    """ Get a raw metric function by name, caching the result to avoid repeated imports.
+    Args:
+        metric (str): The name of the metric function in huntsman.drp.metrics.raw.
+    Returns:
+        Function: The metric function.
+    """
+    try:
+        return _METRIC_FUNCS[metric]
+    except KeyError:
+        func = load_module(f"huntsman.drp.metrics.raw.{metric}")
+        _METRIC_FUNCS[metric] = func
+        return func
+
+
 def _get_raw_metrics(filename, metric_names, logger):
     """ Evaluate metrics for a raw/unprocessed file.
     Args:
@@ -70,14 +87,13 @@ def _get_raw_metrics(filename, metric_names, logger):
 
     # Read the FITS file
     try:
-        header = read_fits_header(filename)
-        data = read_fits_data(filename)  # Returns float array
+        header, data = read_fits_header_and_data(filename)  # Returns float array
     except Exception as err:
         logger.error(f"Unable to read {filename}: {err!r}")
         success = False
     else:
         for metric in metric_names:
-            func = load_module(f"huntsman.drp.metrics.raw.{metric}")
+            func = _get_metric_func(metric)
             try:
                 result.update(func(filename, data=data, header=header))
             except Exception as err:
@@ -93,6 +109,9 @@ class FileIngestor(ProcessQueue):
     # Work around so that tests can run without running the has_wcs metric
     _raw_metrics = deepcopy(RAW_METRICS)
 
+    # Maximum number of filenames per DB query when checking which files are already ingested
+    _find_batch_size = 5000
+
     def __init__(self, directory=None, nproc=None, *args, **kwargs):
         """
         Args:
@@ -111,6 +130,9 @@ class FileIngestor(ProcessQueue):
             nproc = ingestor_config.get("nproc", 1)
         self._nproc = int(nproc)
 
+        # Files are quick to process so take several from the queue at once
+        self._batch_size = int(ingestor_config.get("batch_size", 10))
+
         # Set the monitored directory
         if directory is None:
             directory = ingestor_config["directory"]
@@ -130,8 +152,14 @@ class FileIngestor(ProcessQueue):
         files_in_directory = set(list_fits_files_recursive(self._directory))
         self.logger.debug(f"Found {len(files_in_directory)} FITS files in {self._directory}.")
 
-        # Get set of all files that are ingested and pass screening
-        files_ingested = set(self.exposure_collection.find(screen=True, key="filename"))
+        # Get set of files in the directory that are ingested and pass screening
+        # Query in batches so that only the relevant subset of the collection is returned
+        files_ingested = set()
+        filenames = list(files_in_directory)
+        for i in range(0, len(filenames), self._find_batch_size):
+            document_filter = {"filename": {"in": filenames[i:i + self._find_batch_size]}}
+            files_ingested.update(self.exposure_collection.find(document_filter, screen=True,
+                                                                key="filename"))
 
         # Identify files that require processing
         files_to_process = files_in_directory - files_ingested
@@ -1,11 +1,9 @@
 import os
-import time
-from threading import Thread
+from threading import Thread, Event
+from contextlib import suppress
+from collections import abc, defaultdict
 
 import numpy as np
-import matplotlib.pyplot as plt
-
-from panoptes.utils.time import CountdownTimer
 
 from huntsman.drp.base import HuntsmanBase
 from huntsman.drp.collection import RawExposureCollection, MasterCalibCollection
@@ -29,19 +27,33 @@ class Plotter(HuntsmanBase):
         self.image_dir = os.path.join(self.config["directories"]["plots"], directory_prefix)
         os.makedirs(self.image_dir, exist_ok=True)
 
-        self._plot_configs = {} if not plot_configs else plot_configs
+        # Plot configs can be given as just the key name, e.g. for histograms
+        plot_configs = {} if not plot_configs else plot_configs
+        self._plot_configs = {k: [{"key": c} if isinstance(c, str) else c for c in v]
+                              for k, v in plot_configs.items()}
+
+        # Get camera names corresponding to CCD numbers
+        # +1 because ccd numbering starts at 1
+        cam_configs = self.config["cameras"]["devices"]
+        self._camdict = {i + 1: c["camera_name"] for i, c in enumerate(cam_configs)}
 
         self._exposure_collection = RawExposureCollection(config=self.config)
         self._calib_collection = MasterCalibCollection(config=self.config)
 
         find_kwargs = {} if find_kwargs is None else find_kwargs
-        self._rawdocs = self._exposure_collection.find(**find_kwargs)
+        # Only retrieve the fields that are required to make the plots
+        fields = self._get_required_fields()
+        self._rawdocs = self._exposure_collection.find(fields=fields, **find_kwargs)
         self._caldocs = self._calib_collection.find(**find_kwargs)
 
+        # Cache of intermediate results shared between plots, refreshed by self.makeplots
+        self._cache = {}
+
     # Public methods
 
     def makeplots(self):
         """ Make all plots and write them to the images directory. """
+        self._cache = {}
 
         for d in self._plot_configs.get("plot_by_camera", []):
             self.plot_by_camera(**d)
@@ -70,20 +82,34 @@ class Plotter(HuntsmanBase):
 
         if docs is None:
             docs = self._rawdocs
-
-        # Filter documents that have both data for x key and y key
-        docs = [d for d in docs if (d.get(x_key) is not None) and (d.get(y_key) is not None)]
-
         docs_by_camera = self._get_docs_by_camera(docs)
 
         # Get dict of values organised by camera name
-        x_values_by_camera, xmin, xmax = self._get_values_by_camera(x_key, docs_by_camera)
-        y_values_by_camera, ymin, ymax = self._get_values_by_camera(y_key, docs_by_camera)
+        all_x_values_by_camera, _, _ = self._get_values_by_camera(x_key, docs_by_camera)
+        all_y_values_by_camera, _, _ = self._get_values_by_camera(y_key, docs_by_camera)
+
+        # Only keep values where there is data for both the x key and y key
+        # New dicts are used so that the cached values are not modified
+        x_values_by_camera, y_values_by_camera = {}, {}
+        xmin, xmax, ymin, ymax = np.inf, -np.inf, np.inf, -np.inf
+        for cam_name, x_values in all_x_values_by_camera.items():
+            y_values = all_y_values_by_camera[cam_name]
+
+            mask = ~(np.isnan(x_values) | np.isnan(y_values))
+            x_values, y_values = x_values[mask], y_values[mask]
+
+            x_values_by_camera[cam_name] = x_values
+            y_values_by_camera[cam_name] = y_values
+
+            # Update min / max for common range
+            if mask.any():
+                xmin, xmax = min(x_values.min(), xmin), max(x_values.max(), xmax)
+                ymin, ymax = min(y_values.min(), ymin), max(y_values.max(), ymax)
 
-        if not any([_ for _ in x_values_by_camera.values()]):
+        if not any(_.size for _ in x_values_by_camera.values()):
             self.logger.warning(f"No {x_key} data to make plot for {basename}.")
             return
-        if not any([_ for _ in y_values_by_camera.values()]):
+        if not any(_.size for _ in y_values_by_camera.values()):
             self.logger.warning(f"No {y_key} data to make plot for {basename}.")
             return
 
@@ -112,21 +138,22 @@ class Plotter(HuntsmanBase):
             y_key (str): Flattened name of the document field to plot on the y-axis.
             **kwargs: Parsed to self.plot_by_camera.
         """
-        filter_names = set([d["filter"] for d in self._rawdocs])
-
-        for filter_name in filter_names:
-            docs = [d for d in self._rawdocs if d["filter"] == filter_name]
+        for filter_name, docs in self._get_docs_by_filter().items():
             basename = f"{x_key}_{y_key}-{filter_name}"
             self.plot_by_camera(x_key, y_key, basename=basename, docs=docs, **kwargs)
 
-    def plot_hist_by_camera(self, key, basename=None, docs=None, **kwargs):
+    def plot_hist_by_camera(self, key, basename=None, docs=None, bins=10, density=False,
+                            fill=True, **kwargs):
         """ Plot histograms of quantities by camera.
         Args:
             key (str): Flattened name of the document field to plot.
             basename (str, optional): The file basename. If not provided, key is used.
             docs (list of Document, optional): A list of documents to plot. If None, will use
                 self._rawdocs.
-            **kwargs: Parsed to matplotlib.pyplot.
+            bins (int, optional): The number of histogram bins. Default: 10.
+            density (bool, optional): If True, plot the probability density. Default: False.
+            fill (bool, optional): If True (default), fill the area under the histogram.
+            **kwargs: Parsed to matplotlib.axes.Axes.stairs.
         """
         basename = basename if basename is not None else key
 
@@ -137,7 +164,7 @@ class Plotter(HuntsmanBase):
         # Get dict of values organised by camera name
         values_by_camera, vmin, vmax = self._get_values_by_camera(key, docs_by_camera)
 
-        if not any([_ for _ in values_by_camera.values()]):
+        if not any((~np.isnan(_)).any() for _ in values_by_camera.values()):
             self.logger.warning(f"No {key} data to make hist for {basename}.")
             return
 
@@ -145,7 +172,12 @@ class Plotter(HuntsmanBase):
         fig, axes = self._make_fig_by_camera(n_cameras=len(values_by_camera))
 
         for (ax, (cam_name, values)) in zip(axes, values_by_camera.items()):
-            ax.hist(values, range=(vmin, vmax), **kwargs)
+
+            # Compute the histogram directly and draw it as a single artist rather than a patch
+            # for each bin, which is what ax.hist does
+            counts, edges = np.histogram(values[~np.isnan(values)], bins=bins, range=(vmin, vmax),
+                                         density=density)
+            ax.stairs(counts, edges, fill=fill, **kwargs)
             ax.set_title(f"{cam_name}")
         fig.suptitle(basename)
 
@@ -157,29 +189,74 @@ class Plotter(HuntsmanBase):
             key (str): The flattened key to plot.
             **kwargs: Parsed to self.plot_hist_by_camera.
         """
-        filter_names = set([d["filter"] for d in self._rawdocs])
-
-        for filter_name in filter_names:
-            docs = [d for d in self._rawdocs if d["filter"] == filter_name]
+        for filter_name, docs in self._get_docs_by_filter().items():
             basename = f"{key}-{filter_name}"
             self.plot_hist_by_camera(key, basename=basename, docs=docs, **kwargs)
 
+    def _get_docs_by_filter(self):
+        """ Return dict of raw documents with keys of filter name.
+        The result is cached so that the same lists are reused between plots.
+        Returns:
+            dict: Dict of filter_name: list of docs.
+        """
+        try:
+            return self._cache["docs_by_filter"]
+        except KeyError:
+            pass
+
+        # Group the documents in a single pass
+        docs_by_filter = defaultdict(list)
+        for d in self._rawdocs:
+            docs_by_filter[d["filter"]].append(d)
+        docs_by_filter = dict(docs_by_filter)
+
+        self._cache["docs_by_filter"] = docs_by_filter
+        return docs_by_filter
+
+    def _get_required_fields(self):
+        """ Get the document fields referenced by the plot configs.
+        Returns:
+            list of str or None: The required fields. None if they cannot be determined.
+        """
+        # Fields required to group the documents and to create the document objects
+        fields = {"filter", "ccd", "date", "dateObs"}
+
+        for plot_configs in self._plot_configs.values():
+            for plot_config in plot_configs:
+
+                # Fall back on retrieving whole documents if a config is not understood
+                if not isinstance(plot_config, abc.Mapping):
+                    return None
+
+                fields.update(plot_config[k] for k in ("key", "x_key", "y_key")
+                              if k in plot_config)
+
+        return sorted(fields)
+
     def _get_docs_by_camera(self, docs):
         """ Return dict of documents with keys of camera name.
+        The result is cached by the identity of the docs list.
         Args:
             docs (list): The list of docs.
         Returns:
             dict: Dict of camera_name: list of docs.
         """
-        # Get camera names corresponding to CCD numbers
-        cam_configs = self.config["cameras"]["devices"]
-        # +1 because ccd numbering starts at 1
-        camdict = {i + 1: cam_configs[i]["camera_name"] for i in range(len(cam_configs))}
+        cache_key = ("docs_by_camera", id(docs))
+        try:
+            return self._cache[cache_key][1]
+        except KeyError:
+            pass
+
+        # Group the documents in a single pass, keeping the camera order
+        docs_by_ccd = {ccd: [] for ccd in self._camdict.keys()}
+        for d in docs:
+            with suppress(KeyError):
+                docs_by_ccd[d["ccd"]].append(d)
 
         docs_by_camera = {}
-        for ccd, cam_name in camdict.items():
+        for ccd, cam_name in self._camdict.items():
 
-            camera_docs = [d for d in docs if d["ccd"] == ccd]
+            camera_docs = docs_by_ccd[ccd]
             # Drop any cameras with no documents (e.g. testing cameras)
             if not camera_docs:
                 self.logger.debug(f"No matching documents for camera {cam_name}.")
@@ -187,6 +264,9 @@ class Plotter(HuntsmanBase):
 
             docs_by_camera[cam_name] = camera_docs
 
+        # Also store the docs to make sure their id is not reused while in the cache
+        self._cache[cache_key] = (docs, docs_by_camera)
+
         return docs_by_camera
 
     def _get_values_by_camera(self, key, docs_by_camera):
@@ -195,26 +275,66 @@ class Plotter(HuntsmanBase):
             key (str): The name of the quantity to get.
             docs_by_camera (dict): Dict of cam_name: docs.
         Returns:
-            dict: Dict of camera_name: list of values.
+            dict: Dict of camera_name: array of values, with NaN for missing values.
             float: The minimum value of all values
             flat: The maximum value of all values.
         """
+        cache_key = ("values_by_camera", key, id(docs_by_camera))
+        try:
+            return self._cache[cache_key][1]
+        except KeyError:
+            pass
+
+        getter = self._get_key_getter(key)
+
         # Get dict of values organised by camera name
         values_by_camera = {}
         vmax = -np.inf
         vmin = np.inf
         for cam_name, docs in docs_by_camera.items():
 
-            # Some measurements may be missing and get will return None
-            values = [v for v in [d.get(key) for d in docs] if v is not None]
+            # Some measurements may be missing and get will return None, which becomes NaN
+            # NaNs are kept so that values for different keys stay aligned with the documents
+            values = np.array([getter(d) for d in docs], dtype="float64")
             values_by_camera[cam_name] = values
 
             # Update min / max for common range
-            if values:
-                vmin = min(np.nanmin(values), vmin)
-                vmax = max(np.nanmax(values), vmax)
+            # fmin / fmax ignore NaNs without having to make a masked copy of the values
+            vmin = np.fmin(np.fmin.reduce(values), vmin)
+            vmax = np.fmax(np.fmax.reduce(values), vmax)
+
+        result = values_by_camera, vmin, vmax
+        self._cache[cache_key] = (docs_by_camera, result)
+
+        return result
 
-        return values_by_camera, vmin, vmax
+    def _get_key_getter(self, key):
+        """ Return a function that gets the value of a flattened key from a document.
+        This avoids parsing the key separately for each document.
+        Args:
+            key (str): The flattened key name.
+        Returns:
+            callable: Function that returns the value, or None if it does not exist.
+        """
+        cache_key = ("key_getter", key)
+        try:
+            return self._cache[cache_key]
+        except KeyError:
+            pass
+
+        keys = tuple(key.split("."))
+
+        def getter(document):
+            value = document
+            for k in keys:
+                try:
+                    value = value[k]
+                except (KeyError, TypeError):
+                    return None
+            return value
+
+        self._cache[cache_key] = getter
+        return getter
 
     def _make_fig_by_camera(self, n_cameras, n_col=5, figsize=3):
         """ Make a figure with subplots for each camera.
@@ -226,17 +346,18 @@ class Plotter(HuntsmanBase):
             matplotlib.pyplot.Figure: The figure object.
             list of matplotlib.pyplot.Axes: The axes for each subplot.
         """
+        # Import here to avoid loading matplotlib until plots are made
+        from matplotlib.figure import Figure
+
         n_row = int((n_cameras - 1) / n_col) + 1
-        fig = plt.figure(figsize=(n_col * figsize, n_row * figsize))
+        fig = Figure(figsize=(n_col * figsize, n_row * figsize))
 
-        axes = []
-        for i in range(n_row):
-            for j in range(n_col):
-                idx = i * n_col + j
-                if idx < n_cameras:
-                    axes.append(fig.add_subplot(n_row, n_col, idx + 1))
+        # Create the grid of axes at once, then remove any unused axes
+        axes = fig.subplots(n_row, n_col, squeeze=False).ravel()
+        for ax in axes[n_cameras:]:
+            fig.delaxes(ax)
 
-        return fig, axes
+        return fig, list(axes[:n_cameras])
 
     def _savefig(self, fig, basename, dpi=150, tight_layout=True):
         """ Save figure to images directory.
@@ -261,9 +382,9 @@ class PlotterService(HuntsmanBase):
 
     def __init__(self, sleep_interval=1, **kwargs):
         super().__init__(**kwargs)
-        self.plotters = self._create_plotters()
+        self._plotters = None
 
-        self._stop_threads = True
+        self._stop_event = Event()
         self._sleep_interval = sleep_interval * 3600
         self._run_thread = Thread(target=self._run)
 
@@ -271,35 +392,62 @@ class PlotterService(HuntsmanBase):
     def is_running(self):
         return self._run_thread.is_alive()
 
+    @property
+    def plotters(self):
+        """ The plotters specified in the config, created on first access. """
+        if self._plotters is None:
+            self._plotters = self._create_plotters()
+        return self._plotters
+
     def start(self):
         """ Start the service. """
         self.logger.debug(f"Starting {self}.")
+        self._stop_event.clear()
         self._run_thread.start()
 
     def stop(self):
         """ Stop the service. """
         self.logger.debug(f"Stopping {self}.")
-        self._stop_threads = True
+        self._stop_event.set()
         self._run_thread.join()
         self.logger.info(f"{self} stopped.")
 
     def _run(self):
         """ Continually update plots until the service is stopped. """
-        self._stop_threads = False
-
         while True:
-            for plotter in self.plotters:
-                plotter.makeplots()
 
-            self.logger.debug(f"Sleeping for {self._sleep_interval}s.")
+            # Make new plotters each time so that the plots use up-to-date documents
+            self._plotters = self._create_plotters()
+
+            for plotter in self._plotters:
 
-            timer = CountdownTimer(self._sleep_interval)
-            while not timer.expired():
-                if self._stop_threads:
+                if self._stop_event.is_set():
                     return
-                time.sleep(1)
+
+                # Errors are logged so that one bad plotter does not stop the others
+                try:
+                    plotter.makeplots()
+                except Exception as err:
+                    self.logger.error(f"Exception while making plots in {plotter.image_dir}:"
+                                      f" {err!r}")
+
+            self.logger.debug(f"Sleeping for {self._sleep_interval}s.")
+
+            # Returns immediately if the service is stopped while sleeping
+            if self._stop_event.wait(timeout=self._sleep_interval):
+                return
 
     def _create_plotters(self):
-        """ Create a list of plotters from the config. """
-        plotter_configs = self.config["plotter"]
-        return [Plotter(config=self.config, logger=self.logger, **c) for c in plotter_configs]
+        """ Create a list of plotters from the config.
+        Plotters that cannot be created are logged and skipped.
+        Returns:
+            list of Plotter: The plotters.
+        """
+        plotters = []
+        for plotter_config in self.config["plotter"]:
+            try:
+                plotters.append(Plotter(config=self.config, logger=self.logger, **plotter_config))
+            except Exception as err:
+                self.logger.error(f"Exception while creating plotter for {plotter_config}:"
+                                  f" {err!r}")
+        return plotters
@@ -1,11 +1,13 @@
+import os
 import pytest
 import time
-from copy import deepcopy
+import uuid
+import shutil
+import pickle
 
 from huntsman.drp.core import get_config
 from huntsman.drp.fitsutil import FitsHeaderTranslator
 from huntsman.drp.collection import RawExposureCollection
-from huntsman.drp import refcat as rc
 from huntsman.drp.utils import testing
 
 # ===========================================================================
@@ -29,8 +31,11 @@ def session_config():
 
 @pytest.fixture(scope="function")
 def config(session_config):
-    """ Function scope version of config_module that should be used in tests """
-    return deepcopy(session_config)
+    """ Function scope version of config_module that should be used in tests.
+    Tests (and the objects they create) modify the config, so each test needs its own copy. The
+    config only contains plain types, so a pickle round trip is used as a faster deepcopy.
+    """
+    return pickle.loads(pickle.dumps(session_config, protocol=pickle.HIGHEST_PROTOCOL))
 
 # ===========================================================================
 # Reference catalogue
@@ -45,6 +50,9 @@ def refcat_filename(session_config):
 def testing_refcat_server(session_config, refcat_filename):
     """ A testing refcat server that loads the refcat from file rather than downloading it.
     """
+    # Import here so that the refcat dependencies are only loaded by tests that use them
+    from huntsman.drp import refcat as rc
+
     refcat_kwargs = dict(refcat_filename=refcat_filename)
 
     # Yield the refcat server process
@@ -63,38 +71,74 @@ def testing_refcat_server(session_config, refcat_filename):
 # Testing data
 
 
+def copy_fake_data(parsed_headers, directory):
+    """ Copy fake data files into a new directory.
+    Args:
+        parsed_headers (dict): Dict of filename: parsed header for the files to copy.
+        directory (str): The directory in which to copy the files.
+    Returns:
+        list of dict: The parsed headers with the new filenames.
+    """
+    documents = []
+    for filename, parsed_header in parsed_headers.items():
+        new_filename = os.path.join(directory, os.path.basename(filename))
+        shutil.copy(filename, new_filename)
+        documents.append({**parsed_header, "filename": new_filename})
+    return documents
+
+
+@pytest.fixture(scope="session")
+def fake_exposure_sequence(pytestconfig, session_config):
+    """ Session scope fake exposure sequence, so the fake FITS files are only generated once.
+    The files are kept in the pytest cache directory so they can be reused by later test runs.
+    Tests should use copies of the files rather than the originals (see copy_fake_data).
+    """
+    cache_dir = str(pytestconfig.cache.makedir("fake_exposure_sequence"))
+    expseq = testing.FakeExposureSequence(config=session_config)
+    expseq.load_or_generate_fake_data(directory=cache_dir)
+    return expseq
+
+
+@pytest.fixture(scope="session")
+def fake_exposure_headers(session_config, fake_exposure_sequence):
+    """ Session scope parsed headers of the fake exposure sequence, so that the headers are only
+    parsed once. Function scope fixtures restore the collection from these before each test.
+    """
+    fits_header_translator = FitsHeaderTranslator(config=session_config)
+
+    header_dict = fake_exposure_sequence.header_dict
+    parsed_headers = fits_header_translator.parse_headers(header_dict.values())
+
+    for filename, parsed_header in zip(header_dict.keys(), parsed_headers):
+        parsed_header["filename"] = filename
+
+    return dict(zip(header_dict.keys(), parsed_headers))
+
+
 @pytest.fixture(scope="function")
-def exposure_collection(tmp_path_factory, config):
+def exposure_collection(tmp_path_factory, config, fake_exposure_headers):
     """
     Create a temporary directory populated with fake FITS images, then parse the images into the
     raw data table.
     """
-    fits_header_translator = FitsHeaderTranslator(config=config)
-
-    # Generate the fake data
+    # Copy the fake data
     tempdir = tmp_path_factory.mktemp("test_exposure_sequence")
-    expseq = testing.FakeExposureSequence(config=config)
-    expseq.generate_fake_data(directory=tempdir)
+    parsed_headers = copy_fake_data(fake_exposure_headers, directory=tempdir)
 
     # Populate the database
-    exposure_collection = RawExposureCollection(config=config, collection_name="fake_data")
-    exposure_collection.delete_all(really=True)
+    # Use a unique collection name so that the collection does not need to be cleared first
+    collection_name = f"fake_data_{uuid.uuid4().hex[:8]}"
+    exposure_collection = RawExposureCollection(config=config, collection_name=collection_name)
 
-    for filename, header in expseq.header_dict.items():
-
-        # Parse the header
-        parsed_header = fits_header_translator.parse_header(header)
-        parsed_header["filename"] = filename
-
-        # Insert the parsed header into the DB table
-        exposure_collection.insert_one(parsed_header)
+    # Insert the parsed headers into the DB table
+    exposure_collection.insert_many(parsed_headers, ordered=False)
 
     # Make sure table has the correct number of rows
-    assert exposure_collection.count_documents() == expseq.file_count
+    assert exposure_collection.count_documents() == len(fake_exposure_headers)
     yield exposure_collection
 
-    # Remove the metadata from the DB ready for other tests
-    exposure_collection.delete_all(really=True)
+    # Remove the collection from the DB
+    exposure_collection.drop(really=True)
 
 
 @pytest.fixture(scope="session")
@@ -130,35 +174,24 @@ def master_calib_collection_real_data(session_config):
 
 @pytest.fixture(scope="function")
 def tempdir_and_exposure_collection_with_uningested_files(tmp_path_factory, config,
-                                                          exposure_collection):
+                                                          exposure_collection,
+                                                          fake_exposure_headers):
     """
     Create a temporary directory populated with fake FITS images, then parse the images into the
     raw data table.
     """
-    fits_header_translator = FitsHeaderTranslator(config=config)
-
     # Clear the exposure collection of any existing documents
     exposure_collection.delete_all(really=True)
 
-    # Generate the fake data
+    # Copy the fake data
     tempdir = tmp_path_factory.mktemp("dir_with_uningested_files")
-    expseq = testing.FakeExposureSequence(config=config)
-    expseq.generate_fake_data(directory=tempdir)
+    parsed_headers = copy_fake_data(fake_exposure_headers, directory=tempdir)
 
     # Populate the database
-    n_stop = len(expseq.header_dict) * 0.7 // 1  # ingest ~70% of the files
-    n = 0
-    for filename, header in expseq.header_dict.items():
-        if n >= n_stop:
-            break
-        n += 1
-
-        # Parse the header
-        parsed_header = fits_header_translator.parse_header(header)
-        parsed_header["filename"] = filename
+    n_stop = int(len(parsed_headers) * 0.7)  # ingest ~70% of the files
 
-        # Insert the parsed header into the DB table
-        exposure_collection.insert_one(parsed_header)
+    # Insert the parsed headers into the DB table
+    exposure_collection.insert_many(parsed_headers[:n_stop], ordered=False)
 
     # Make sure table has the correct number of rows
     assert exposure_collection.count_documents() == n_stop
@@ -1,6 +1,49 @@
+import os
 import time
+import pytest
 
-from huntsman.drp.services.calexp import CalexpQualityMonitor
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+
+from huntsman.drp.services.calexp import CalexpQualityMonitor, RefcatCache
+
+
+class FakeDocument():
+    """ Minimal document with a central coordinate. """
+
+    def __init__(self, ra, dec):
+        self._coord = SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
+
+    def get_central_skycoord(self):
+        return self._coord
+
+
+class FakeRefcatClient():
+    """ Refcat client that writes the number of calls made so far to the catalogue file. """
+
+    def __init__(self):
+        self.n_calls = 0
+
+    def make_reference_catalogue(self, coords, filename, radius_degrees):
+        self.n_calls += 1
+        with open(filename, "w") as f:
+            f.write(f"{self.n_calls}")
+
+
+def read_refcat(filename):
+    with open(filename, "r") as f:
+        return int(f.read())
+
+
+@pytest.fixture(scope="function")
+def refcat_cache(config, tmp_path):
+
+    config["directories"]["tmp"] = str(tmp_path / "tmp")
+    cache = RefcatCache(margin=0.5, max_size=2, config=config)
+
+    yield cache
+
+    cache.cleanup()
 
 
 def test_calexp_quality_monitor(exposure_collection_real_data, master_calib_collection_real_data,
@@ -47,3 +90,56 @@ def test_calexp_quality_monitor(exposure_collection_real_data, master_calib_coll
     for md in exposure_collection_real_data.find({"dataType": "science"}):
         exposure_collection_real_data.logger.info(f"{md._document}")
         assert "calexp" not in md["metrics"].keys()
+
+
+def test_refcat_cache_hit(refcat_cache, tmp_path):
+
+    client = FakeRefcatClient()
+
+    refcat_cache.get(FakeDocument(10, -30), refcat_client=client, filename=tmp_path / "1.csv")
+    refcat_cache.get(FakeDocument(10.2, -30), refcat_client=client, filename=tmp_path / "2.csv")
+
+    # The second exposure is within the margin so should use the cached catalogue
+    assert client.n_calls == 1
+    assert read_refcat(tmp_path / "2.csv") == 1
+
+
+def test_refcat_cache_miss(refcat_cache, tmp_path):
+
+    client = FakeRefcatClient()
+
+    refcat_cache.get(FakeDocument(10, -30), refcat_client=client, filename=tmp_path / "1.csv")
+    refcat_cache.get(FakeDocument(12, -30), refcat_client=client, filename=tmp_path / "2.csv")
+
+    # The second exposure is outside the margin so needs a new catalogue
+    assert client.n_calls == 2
+    assert read_refcat(tmp_path / "1.csv") == 1
+    assert read_refcat(tmp_path / "2.csv") == 2
+
+
+def test_refcat_cache_eviction(refcat_cache, tmp_path):
+
+    client = FakeRefcatClient()
+
+    for i, ra in enumerate([10, 20, 30]):
+        refcat_cache.get(FakeDocument(ra, -30), refcat_client=client,
+                         filename=tmp_path / f"{i}.csv")
+    assert client.n_calls == 3
+
+    # Only max_size catalogues should be cached
+    assert len(os.listdir(refcat_cache._directory)) == 2
+
+    # Catalogues given out before eviction should still exist
+    assert read_refcat(tmp_path / "0.csv") == 1
+
+    # The oldest catalogue should have been evicted so a new one is required
+    refcat_cache.get(FakeDocument(10, -30), refcat_client=client, filename=tmp_path / "3.csv")
+    assert client.n_calls == 4
+
+    # The most recent catalogue should still be cached
+    refcat_cache.get(FakeDocument(30, -30), refcat_client=client, filename=tmp_path / "4.csv")
+    assert client.n_calls == 4
+    assert read_refcat(tmp_path / "4.csv") == 3
+
+    refcat_cache.cleanup()
+    assert not os.path.exists(refcat_cache._directory)
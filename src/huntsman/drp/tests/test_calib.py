@@ -49,23 +49,24 @@ def exposure_collection_lite(tmp_path_factory, config_lite):
     exposure_collection = RawExposureCollection(config=config_lite,
                                                 collection_name="fake_data_lite")
 
+    parsed_headers = []
     for filename, header in expseq.header_dict.items():
 
         # Parse the header
         parsed_header = fits_header_translator.parse_header(header)
         parsed_header["filename"] = filename
         parsed_header["metrics"] = {METRIC_SUCCESS_FLAG: True}
+        parsed_headers.append(parsed_header)
 
-        # Insert the parsed header into the DB table
-        exposure_collection.insert_one(parsed_header)
+    # Insert the parsed headers into the DB table
+    exposure_collection.insert_many(parsed_headers, ordered=False)
 
     # Make sure table has the correct number of rows
     assert exposure_collection.count_documents() == expseq.file_count
     yield exposure_collection
 
     # Remove the metadata from the DB ready for other tests
-    all_metadata = exposure_collection.find()
-    exposure_collection.delete_many(all_metadata)
+    exposure_collection.delete_all(really=True)
 
 
 @pytest.fixture(scope="function")
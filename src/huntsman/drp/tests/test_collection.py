@@ -3,7 +3,7 @@ import copy
 from datetime import timedelta
 import numpy as np
 
-from huntsman.drp.utils.date import current_date, parse_date
+from huntsman.drp.utils.date import current_date, parse_date, date_to_ymd
 from huntsman.drp.fitsutil import FitsHeaderTranslator, read_fits_header
 from huntsman.drp.collection import RawExposureCollection
 
@@ -42,6 +42,15 @@ def test_datatable_query_by_date(exposure_collection, config):
             assert date < parse_date(date_max)
 
 
+def test_find_unique_dates_ymd(exposure_collection):
+    """ Test the unique dates computed by the DB match those computed from the documents. """
+    dates = exposure_collection.find(key="date", screen=True)
+    assert dates
+
+    dates_ymd = exposure_collection.find_unique_dates_ymd(screen=True)
+    assert dates_ymd == set([date_to_ymd(d) for d in dates])
+
+
 def test_query_latest(exposure_collection, config, tol=1):
     """Test query_latest finds the correct number of DB entries."""
     date_min = config["exposure_sequence"]["start_date"]
@@ -121,6 +130,21 @@ def test_quality_filter(exposure_collection):
     assert len(matches) == 0
 
 
+def test_find_fields(exposure_collection):
+    """ Check that documents returned with a projection can still be hashed and compared. """
+
+    docs = exposure_collection.find()
+    docs_projected = exposure_collection.find(fields=["dataType"])
+
+    assert len(docs_projected) == len(docs)
+    assert set(docs_projected) == set(docs)
+
+    for doc in docs_projected:
+        assert "dataType" in doc
+        assert "filename" in doc
+        str(doc)
+
+
 def test_insert_duplicate(exposure_collection):
     """ Check an exception is raised when inserting a duplicate document. """
 
@@ -145,8 +169,27 @@ def test_ingest_duplicate_fpack(exposure_collection):
     with pytest.raises(DuplicateKeyError):
         exposure_collection.insert_one(doc2)
 
-    exposure_collection.delete_many(exposure_collection.find(), force=True)
+    exposure_collection.delete_all(really=True)
 
     exposure_collection.insert_one(doc2)
     with pytest.raises(DuplicateKeyError):
         exposure_collection.insert_one(doc1)
+
+
+def test_insert_many_duplicate_fpack(exposure_collection):
+    """ Check an exception is raised when inserting .fits/.fz documents in the same batch. """
+
+    doc = exposure_collection.find()[0]
+
+    doc1 = doc._document.copy()
+    doc1["filename"] = "test_insert_duplicate.fits"
+
+    doc2 = doc._document.copy()
+    doc2["filename"] = "test_insert_duplicate.fits.fz"
+
+    with pytest.raises(DuplicateKeyError):
+        exposure_collection.insert_many([doc1, doc2])
+
+    # Make sure neither document was inserted
+    for d in (doc1, doc2):
+        assert not exposure_collection.find({"filename": d["filename"]})
@@ -1,8 +1,9 @@
 import pytest
+import numpy as np
 from astropy.wcs import WCS
 
 from huntsman.drp.fitsutil import read_fits_header
-from huntsman.drp.metrics import raw
+from huntsman.drp.metrics import raw, calexp
 
 
 @pytest.fixture(scope="function")
@@ -23,3 +24,32 @@ def test_get_wcs_no_solve(filename_with_wcs, header_with_wcs):
     assert "ra_centre" in result
     assert "dec_centre" in result
     assert result["has_wcs"]
+
+
+@pytest.mark.parametrize("shape", [(10, 10), (11, 7)])
+def test_flipped_asymmetry(shape):
+    data = np.random.default_rng(0).normal(size=shape).astype("float32")
+
+    result = raw.flipped_asymmetry(None, data, None)
+
+    assert np.isclose(result["flip_asymm_h"], (data - data[:, ::-1]).std(), rtol=1E-5)
+    assert np.isclose(result["flip_asymm_v"], (data - data[::-1, :]).std(), rtol=1E-5)
+
+
+def test_get_calexp_metric_func():
+
+    # The second lookup of each function should come from the cache
+    for _ in range(2):
+        for func_name in calexp.METRICS:
+            assert calexp._get_metric_func(func_name) is getattr(calexp, func_name)
+
+
+def test_calculate_calexp_metrics_failed_task():
+
+    task_result = {"isrSuccess": False, "charSuccess": False, "calibSuccess": False}
+
+    # Metric functions are looked up on the first call and then retrieved from the cache
+    for _ in range(2):
+        result = calexp.calculate_metrics(task_result)
+        for key, value in task_result.items():
+            assert result[key] == value
@@ -84,3 +84,23 @@ def test_make_reference_catalogue(config, coords, ra_list, dec_list, tolerance=0
             assert (df[key].values >= pranges[key]["lower"]).all()
         with suppress(KeyError):
             assert (df[key].values < pranges[key]["upper"]).all()
+
+
+def test_make_reference_catalogue_limit(config, coords, monkeypatch):
+
+    config["refcat"]["tap_limit"] = 5
+    config["refcat"]["max_cones_per_query"] = 1  # One query per coordinate
+
+    unique_key = config["refcat"]["unique_source_key"]
+
+    def cone_search_multi(self, coords, **kwargs):
+        ra = coords[0].ra.to_value("deg")
+        return pd.DataFrame({unique_key: [f"{ra}_{i}" for i in range(4)]})
+
+    monkeypatch.setattr(rc.TapReferenceCatalogue, "cone_search_multi", cone_search_multi)
+
+    refcat = rc.TapReferenceCatalogue(config=config)
+    df = refcat.make_reference_catalogue(coords)
+
+    # The limit should apply to the combined catalogue rather than to each query
+    assert df.shape[0] == 5
@@ -3,7 +3,8 @@
 import pytest
 from datetime import datetime
 
-from huntsman.drp.fitsutil import read_fits_header
+from huntsman.drp.fitsutil import (read_fits_header, read_fits_data, read_fits_header_and_data,
+                                   FitsHeaderTranslator)
 from huntsman.drp.utils.date import current_date, parse_date, current_date_ymd
 
 
@@ -12,6 +13,28 @@ def test_read_fits_header_bad_extension():
         read_fits_header('bogus_file.lala')
 
 
+def test_read_fits_header_and_data(exposure_collection):
+    filename = exposure_collection.find(key="filename")[0]
+
+    header, data = read_fits_header_and_data(filename)
+
+    assert header == read_fits_header(filename)
+    assert data.dtype == "float32"
+    assert (data == read_fits_data(filename)).all()
+
+
+def test_parse_headers(exposure_collection, config):
+    filenames = exposure_collection.find(key="filename")
+    headers = [read_fits_header(f) for f in filenames]
+
+    fits_header_translator = FitsHeaderTranslator(config=config)
+    parsed_headers = fits_header_translator.parse_headers(headers)
+
+    assert len(parsed_headers) == len(headers)
+    for header, parsed_header in zip(headers, parsed_headers):
+        assert parsed_header == fits_header_translator.parse_header(header)
+
+
 def test_parse_date_datetime():
     parse_date(datetime.today())
 
@@ -21,13 +21,26 @@ def list_fits_files_recursive(directory):
         directory (str): Directory to examine.
     """
     # Create a list of fits files within the directory of interest
+    # Use os.scandir directly with an explicit stack of directories to avoid os.walk overheads
     files_in_directory = []
 
-    for dirpath, dirnames, filenames in os.walk(directory):
-        for file in filenames:
+    directories = [directory]
+    while directories:
+        try:
+            it = os.scandir(directories.pop())
+        except OSError:
+            continue  # Like os.walk, ignore directories that cannot be listed
 
-            # Append the filepath to fpaths if file is a fits or fits.fz file
-            if file.endswith('.fits') or file.endswith('.fits.fz'):
-                files_in_directory.append(os.path.join(dirpath, file))
+        with it:
+            for entry in it:
+
+                # Like os.walk, do not descend into symlinked directories
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        directories.append(entry.path)
+
+                # Append the filepath if file is a fits or fits.fz file
+                elif entry.name.endswith(('.fits', '.fits.fz')):
+                    files_in_directory.append(entry.path)
 
     return files_in_directory
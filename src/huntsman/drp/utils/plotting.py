@@ -1,6 +1,3 @@
-import matplotlib.pyplot as plt
-
-
 def plot_wcs_box(document, ax, linestyle="-", color="k", linewidth=1, **kwargs):
     """ Plot the boundaries of the image in WCS coordinates.
     Args:
@@ -42,7 +39,12 @@ def plot_wcs_boxes(documents, **kwargs):
     Returns:
         matplotlib.Figure, matplotlib.Axes: The figure and axes.
     """
-    fig, ax = plt.subplots()
+    # Import here to avoid loading matplotlib until plots are made
+    # Figure is used rather than pyplot so that figures are not kept open by pyplot
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
 
     for document in documents:
         plot_wcs_box(document, ax, **kwargs)
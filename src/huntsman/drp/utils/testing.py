@@ -1,5 +1,8 @@
 import os
+import json
 import yaml
+import pickle
+import hashlib
 from glob import glob
 from datetime import timedelta
 import numpy as np
@@ -7,7 +10,6 @@ from astropy.io import fits
 from astropy import units as u
 
 from huntsman.drp.core import get_config
-from huntsman.drp.lsst.butler import ButlerRepository, TemporaryButlerRepository
 from huntsman.drp.base import HuntsmanBase
 from huntsman.drp.utils.date import parse_date
 from huntsman.drp.collection import RawExposureCollection, MasterCalibCollection
@@ -16,6 +18,7 @@ from huntsman.drp.lsst.utils.calib import get_calib_filename
 
 
 EXPTIME_BIAS = 1E-32  # Minimum exposure time for ZWO cameras is > 0
+WRITE_BUFFER_SIZE = 1 << 20  # Bytes
 
 
 def load_test_config():
@@ -64,6 +67,9 @@ def create_test_bulter_repository(directory, config=None, with_calibs=False, **k
     Args:
         **kwargs: Parsed to ButlerRepository.
     """
+    # Import here to avoid loading the LSST stack unless a butler repository is required
+    from huntsman.drp.lsst.butler import ButlerRepository
+
     if config is None:
         config = get_config()
 
@@ -125,6 +131,9 @@ def create_test_calib_collection(config=None):
 
     rootdir = os.path.join(config["directories"]["root"], "tests", "data", "calib")
 
+    # Import here to avoid loading the LSST stack unless a butler repository is required
+    from huntsman.drp.lsst.butler import TemporaryButlerRepository
+
     # Use a butler instance to ingest master calibs and get metadata
     calibIds = []
     filenames = []
@@ -199,6 +208,8 @@ class FakeExposureSequence(HuntsmanBase):
         self.bias = self.config["bias"]
         self.pixel_size = self.config["pixel_size"] * u.arcsecond / u.pixel
         self.header_dict = {}
+        # Use a seed if one is provided so that the fake data is reproducible
+        self._rng = np.random.default_rng(self.config.get("seed"))
 
     def generate_fake_data(self, directory):
         """
@@ -254,6 +265,41 @@ class FakeExposureSequence(HuntsmanBase):
                         self._write_data(hdu=hdu, directory=directory)
                         dtime += timedelta(seconds=exptime)  # Increment time
 
+    def load_or_generate_fake_data(self, directory):
+        """ Load the fake data if it was previously generated in directory using the same
+        config and code, otherwise generate it and store the headers so it can be loaded next time.
+        Args:
+            directory (str): The name of the directory in which to store the cached data.
+        """
+        config_str = json.dumps(self.config, sort_keys=True, default=str)
+
+        # The data is made by code in this module, so changes to it must invalidate the cache
+        with open(__file__, "rb") as f:
+            source = f.read()
+
+        data_hash = hashlib.md5(config_str.encode() + source).hexdigest()
+
+        # Use a subdirectory per config so that files from different configs do not clash
+        data_dir = os.path.join(directory, data_hash)
+        cache_filename = os.path.join(data_dir, "headers.pkl")
+
+        try:
+            with open(cache_filename, "rb") as f:
+                header_dict = pickle.load(f)
+            if all(os.path.isfile(filename) for filename in header_dict):
+                self.header_dict = header_dict
+                self.file_count = len(header_dict)
+                return
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        os.makedirs(data_dir, exist_ok=True)
+        self.generate_fake_data(directory=data_dir)
+
+        # Only store the headers after all the files have been written
+        with open(cache_filename, "wb") as f:
+            pickle.dump(self.header_dict, f)
+
     def _get_bias_level(self, exposure_time, ccd_temp=0):
         # TODO: Implement realistic scaling with exposure time
         return self.bias
@@ -266,10 +312,7 @@ class FakeExposureSequence(HuntsmanBase):
         """Make a light frame (either a science image or flat field)."""
 
         adu = self._get_target_brightness(exposure_time=exposure_time, filter=filter)
-        data = np.random.poisson(adu, size=self.shape) + self._get_bias_level(exposure_time)
-        data[data > self.saturate] = self.saturate
-        data = data.astype(self.dtype)
-        assert (data > 0).all()
+        data = self._make_data(adu, offset=self._get_bias_level(exposure_time))
 
         hdu = make_hdu(data=data, date=date, cam_name=cam_name, exposure_time=exposure_time,
                        field=field, filter=filter, image_type="Light Frame",
@@ -280,15 +323,28 @@ class FakeExposureSequence(HuntsmanBase):
         """Make a dark frame (bias or dark)."""
 
         adu = self._get_bias_level(exposure_time=exposure_time) + 1 * exposure_time
-        data = np.random.poisson(adu, size=self.shape)
-        data[data > self.saturate] = self.saturate
-        data = data.astype(self.dtype)
-        assert (data > 0).all()
+        data = self._make_data(adu)
 
         hdu = make_hdu(data=data, date=date, cam_name=cam_name, exposure_time=exposure_time,
                        field=field, image_type="Dark Frame", pixel_size=self.pixel_size)
         return hdu
 
+    def _make_data(self, adu, offset=0):
+        """ Make fake image data with Poisson noise.
+        Args:
+            adu (float): The mean number of counts.
+            offset (float, optional): Constant offset added to the counts (e.g. bias level).
+        Returns:
+            np.ndarray: The image data.
+        """
+        # Modify the data in-place to avoid allocating new arrays
+        data = self._rng.poisson(adu, size=self.shape)
+        data += offset
+        np.minimum(data, self.saturate, out=data)
+        data = data.astype(self.dtype, copy=False)
+        assert (data > 0).all()
+        return data
+
     def _get_filename(self, directory):
         """ Get the filename for the next exposure in the sequence.
         Args:
@@ -304,7 +360,14 @@ class FakeExposureSequence(HuntsmanBase):
             directory (str): The name of the directory in which to store the file.
         """
         filename = self._get_filename(directory)
-        hdu.writeto(filename, overwrite=True)
-        # Read the header from file because astropy can modify the header during write
-        self.header_dict[filename] = fits.getheader(filename)
+
+        # The headers are made by make_hdu so skip verification to speed up writing
+        # Write through a large buffer so that each file is written with few system calls
+        with open(filename, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+            hdu.writeto(f, output_verify="ignore", checksum=False)
+
+        # Astropy can modify the header during write, so use the written header rather than the
+        # original. Round-tripping through a string gives the header as it would be read from file
+        # without having to read the file again.
+        self.header_dict[filename] = fits.Header.fromstring(hdu.header.tostring())
         self.file_count += 1